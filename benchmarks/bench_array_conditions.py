@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the cost of updates of an array of battery levels, one per agent,
+# with one task per agent waiting for its battery to be low, waiting with
+# functions and with element predicates. Sensor noise updates wake no task,
+# drain updates decrease the batteries by random amounts, so that a few
+# tasks are woken per update until all are.
+
+import sys
+sys.path.append('..')
+from teer import *
+import numpy
+
+UPDATES = 100
+
+def battery_scheduler(agents):
+	class BatteryScheduler(Scheduler):
+		battery = ArrayConditionVariable(agents, 100.)
+	sched = BatteryScheduler()
+	sched.log_sink = None
+	return sched
+
+def lambda_agent(sched, i):
+	yield WaitCondition(lambda: sched.battery[i] < 10)
+
+def predicate_agent(sched, i):
+	yield WaitCondition(Var('battery')[i] < 10)
+
+def update(sched, changes):
+	""" Return the number of updates per second, adding each row of changes to the batteries """
+	start_time = time.time()
+	for change in changes:
+		sched.battery = sched.battery + change
+		sched.step()
+	return len(changes) / (time.time() - start_time)
+
+def measure(agent, agents):
+	""" Return the number of noise and drain updates per second """
+	sched = battery_scheduler(agents)
+	for i in xrange(agents):
+		sched.new_task(agent(sched, i))
+	sched.step()
+	random = numpy.random.RandomState(0)
+	noise = random.uniform(-1., 1., (UPDATES, agents))
+	noise[1::2] = -noise[::2]
+	noise_rate = update(sched, noise)
+	# every battery is low after UPDATES updates
+	drains = -random.uniform(0, 2 * 90. / UPDATES, (UPDATES, agents))
+	drains[-1] = -100.
+	drain_rate = update(sched, drains)
+	assert not sched.taskmap
+	return noise_rate, drain_rate
+
+print '        noise [updates/s]                   drain [updates/s]'
+print 'agents  functions  predicates  speedup      functions  predicates  speedup'
+for agents in [10, 100, 1000, 10000]:
+	lambda_noise, lambda_drain = measure(lambda_agent, agents)
+	predicate_noise, predicate_drain = measure(predicate_agent, agents)
+	print '%6d  %9.0f  %10.0f  %7.1f      %9.0f  %10.0f  %7.1f' % (agents,
+		lambda_noise, predicate_noise, predicate_noise / lambda_noise,
+		lambda_drain, predicate_drain, predicate_drain / lambda_drain)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Compare the wake-up jitter, the delay between the requested and the actual
+# time of wake-up, of a periodic task with the sleep-based run() of
+# TimerScheduler and with AsyncioScheduler.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+def periodic(sched, period, count, delays):
+	next_time = sched.current_time()
+	for i in xrange(count):
+		next_time += period
+		yield WaitDuration(next_time - sched.current_time())
+		delays.append(sched.current_time() - next_time)
+
+def measure(sched, period, count):
+	""" Return the sorted wake-up delays of a periodic task """
+	delays = []
+	sched.log_sink = None
+	sched.new_task(periodic(sched, period, count, delays))
+	sched.run()
+	delays.sort()
+	return delays
+
+print 'scheduler         mean [us]  median [us]  p99 [us]  max [us]'
+for name, sched_class in [('TimerScheduler', TimerScheduler), ('AsyncioScheduler', AsyncioScheduler)]:
+	delays = measure(sched_class(), 0.005, 400)
+	print '%-16s  %9.1f  %11.1f  %8.1f  %8.1f' % (name, 1e6 * sum(delays) / len(delays),
+		1e6 * delays[len(delays) // 2], 1e6 * delays[int(len(delays) * 0.99)], 1e6 * delays[-1])
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the number of messages per second from a producer task to a
+# consumer task, through condition variables, the producer setting a message
+# and waiting for the consumer to acknowledge it so that none is lost, and
+# through channels of various capacities. Then measure the number of 1 MB
+# frames per second read from a device and passed to a consumer, as bytes
+# through a channel and read into the slots of a ring buffer channel.
+
+import sys
+sys.path.append('..')
+from teer import *
+import io
+
+MESSAGES = 100000
+FRAMES = 1000
+FRAME_SIZE = 1 << 20
+
+class MessageScheduler(Scheduler):
+	message = ConditionVariable(-1)
+	acknowledged = ConditionVariable(-1)
+
+def condition_producer(sched, count):
+	for i in xrange(count):
+		sched.message = i
+		yield WaitCondition(lambda: sched.acknowledged == i)
+
+def condition_consumer(sched, count):
+	for i in xrange(count):
+		yield WaitCondition(lambda: sched.message == i)
+		sched.acknowledged = sched.message
+
+def channel_producer(channel, count):
+	for i in xrange(count):
+		yield Send(channel, i)
+
+def channel_consumer(channel, count):
+	for i in xrange(count):
+		message = yield Recv(channel)
+
+def frame_producer(channel, device, count):
+	for i in xrange(count):
+		yield Send(channel, device.read(FRAME_SIZE))
+
+def slot_producer(channel, device, count):
+	for i in xrange(count):
+		slot = yield Reserve(channel)
+		device.readinto(slot)
+		yield Send(channel, slot)
+
+def frame_consumer(channel, count):
+	for i in xrange(count):
+		frame = yield Recv(channel)
+
+def slot_consumer(channel, count):
+	for i in xrange(count):
+		slot = yield Recv(channel)
+		channel.release(slot)
+
+def rate(sched, producer, consumer, count):
+	""" Return the number of messages per second """
+	sched.log_sink = None
+	sched.new_task(producer)
+	sched.new_task(consumer)
+	start_time = time.time()
+	while sched.step():
+		pass
+	duration = time.time() - start_time
+	assert not sched.taskmap
+	return count / duration
+
+print '* Messages, %d *' % MESSAGES
+sched = MessageScheduler()
+print 'condition variables: %9.0f messages/s' % rate(sched, condition_producer(sched, MESSAGES), condition_consumer(sched, MESSAGES), MESSAGES)
+for capacity in [0, 1, 64]:
+	sched = MessageScheduler()
+	channel = sched.new_channel(capacity)
+	print 'channel, capacity %2d: %9.0f messages/s' % (capacity, rate(sched, channel_producer(channel, MESSAGES), channel_consumer(channel, MESSAGES), MESSAGES))
+
+print '* Frames of %d bytes, %d *' % (FRAME_SIZE, FRAMES)
+device = io.FileIO('/dev/zero')
+sched = MessageScheduler()
+channel = sched.new_channel(4)
+print 'bytes, capacity 4:   %9.0f frames/s' % rate(sched, frame_producer(channel, device, FRAMES), frame_consumer(channel, FRAMES), FRAMES)
+sched = MessageScheduler()
+channel = sched.new_ring_buffer_channel(4, FRAME_SIZE)
+print 'ring buffer, 4 slots: %8.0f frames/s' % rate(sched, slot_producer(channel, device, FRAMES), slot_consumer(channel, FRAMES), FRAMES)
+device.close()
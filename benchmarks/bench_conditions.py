@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure wait/wake cycles of WaitCondition per second, with the cached
+# dependency extraction and with the former introspection of the predicate.
+
+import sys
+sys.path.append('..')
+from teer import *
+import inspect
+
+class CounterScheduler(Scheduler):
+	counter = ConditionVariable(0)
+
+class LegacyScheduler(CounterScheduler):
+	""" The dependency extraction as it was before being cached """
+	def _add_condition(self,entry):
+		condition = entry[0]
+		vars_in_cond = dict(inspect.getmembers(dict(inspect.getmembers(condition))['func_code']))['co_names']
+		for var in vars_in_cond:
+			if var not in self.cond_waiting:
+				self.cond_waiting[var] = []
+			self.cond_waiting[var].append(entry)
+	def _del_condition(self,candidate):
+		(condition, task) = candidate
+		vars_in_cond = dict(inspect.getmembers(dict(inspect.getmembers(condition))['func_code']))['co_names']
+		for var in vars_in_cond:
+			if var in self.cond_waiting:
+				self.cond_waiting[var].remove(candidate)
+				if not self.cond_waiting[var]:
+					del self.cond_waiting[var]
+
+def waiter(sched, cycles):
+	for i in xrange(cycles):
+		yield WaitCondition(lambda: sched.counter > i)
+
+def run(sched_class, cycles):
+	""" Return the number of wait/wake cycles per second """
+	sched = sched_class()
+	sched.log_sink = None
+	sched.new_task(waiter(sched, cycles))
+	sched.step()
+	start_time = time.time()
+	for i in xrange(cycles):
+		sched.counter += 1
+		sched.step()
+	duration = time.time() - start_time
+	assert not sched.taskmap
+	return cycles / duration
+
+cycles = 20000
+legacy = run(LegacyScheduler, cycles)
+cached = run(CounterScheduler, cycles)
+print 'legacy: %8.0f cycles/s' % legacy
+print 'cached: %8.0f cycles/s' % cached
+print 'speedup: %.1f' % (cached / legacy)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Compare the cost of task exit notification between the indexed wait graph
+# and the former implementation, which scanned all lists in exit_waiting.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class LegacyScheduler(Scheduler):
+	""" The exit notification as it was before the wait graph was indexed """
+	def _exit(self,exiting_task):
+		self._log_task_terminated(exiting_task)
+		del self.taskmap[exiting_task.tid]
+		for task in self.exit_waiting.pop(exiting_task.tid,[]):
+			if task.waitmode == Task.WAIT_ANY:
+				for waited_tid, waiting_tasks_list in self.exit_waiting.iteritems():
+					for waiting_task in waiting_tasks_list:
+						if waiting_task.tid == task.tid:
+							waiting_tasks_list.remove(waiting_task)
+				task.sendval = exiting_task.tid
+				self._schedule(task)
+			else:
+				are_still_waiting = False
+				for waited_tid, waiting_tasks_list in self.exit_waiting.iteritems():
+					for waiting_task in waiting_tasks_list:
+						if waiting_task.tid == task.tid:
+							are_still_waiting = True
+				if not are_still_waiting:
+					task.sendval = exiting_task.tid
+					self._schedule(task)
+		self.exit_waiting = dict((k,v) for (k,v) in self.exit_waiting.iteritems() if v)
+	def _wait_for_exit(self,task,waittid):
+		if waittid in self.taskmap:
+			self.exit_waiting.setdefault(waittid,[]).append(task)
+			return True
+		else:
+			return False
+
+def worker(lifetime):
+	for i in xrange(lifetime):
+		yield Pass()
+
+def supervisor(tids, wait_all):
+	if wait_all:
+		yield WaitAllTasks(tids)
+	else:
+		yield WaitAnyTasks(tids)
+
+def run(sched_class, supervisors, workers_per_supervisor):
+	""" Return the time to run supervisors watching short-lived workers """
+	sched = sched_class()
+	sched.log_sink = None
+	lifetime = 0
+	for i in xrange(supervisors):
+		tids = []
+		for j in xrange(workers_per_supervisor):
+			# workers exit at different steps, so waits stay outstanding
+			lifetime = (lifetime + 1) % 8
+			tids.append(sched.new_task(worker(lifetime + 1)))
+		sched.new_task(supervisor(tids, i % 2 == 0))
+	start_time = time.time()
+	sched.step()
+	assert not sched.taskmap
+	return time.time() - start_time
+
+print 'supervisors  workers  legacy [s]  indexed [s]  speedup'
+for supervisors in [10, 100, 1000, 3000]:
+	legacy = run(LegacyScheduler, supervisors, 4)
+	indexed = run(Scheduler, supervisors, 4)
+	print '%11d  %7d  %10.4f  %11.4f  %7.1f' % (supervisors, supervisors * 4, legacy, indexed, legacy / indexed)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Run robots with a 50 Hz control loop and a battery monitor for a few
+# seconds, either with one TimerScheduler per robot, each in its own thread,
+# or with one FleetScheduler per robot, all in a Fleet. Report the CPU used,
+# the number of robots a core could run, and the lateness of the loops.
+
+import sys
+sys.path.append('..')
+from teer import *
+import os
+import threading
+
+DURATION = 2.
+PERIOD = 0.02
+
+class RobotTimerScheduler(TimerScheduler):
+	battery = ConditionVariable(100.)
+
+class RobotFleetScheduler(FleetScheduler):
+	battery = ConditionVariable(100.)
+
+def control(sched, end_time, lateness):
+	next_time = sched.current_time()
+	while next_time < end_time:
+		next_time += PERIOD
+		yield WaitDuration(next_time - sched.current_time())
+		lateness.append(sched.current_time() - next_time)
+		sched.battery -= 0.01
+
+def monitor(sched):
+	yield WaitCondition(lambda: sched.battery < 0)
+
+def stopper(sched, control_tid, monitor_tid):
+	# stop the monitor with the control loop, for run() to return
+	yield WaitTask(control_tid)
+	sched.kill_task(monitor_tid)
+
+def add_robot(sched, end_time, lateness):
+	sched.log_sink = None
+	control_tid = sched.new_task(control(sched, end_time, lateness))
+	monitor_tid = sched.new_task(monitor(sched))
+	sched.new_task(stopper(sched, control_tid, monitor_tid))
+
+def run_threads(robots, lateness):
+	end_time = time.time() + DURATION
+	scheds = []
+	threads = []
+	for i in xrange(robots):
+		sched = RobotTimerScheduler()
+		add_robot(sched, end_time, lateness)
+		scheds.append(sched)
+		threads.append(threading.Thread(target=sched.run))
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	for sched in scheds:
+		sched.close()
+
+def run_fleet(robots, lateness):
+	end_time = time.time() + DURATION
+	fleet = Fleet()
+	for i in xrange(robots):
+		add_robot(RobotFleetScheduler(fleet), end_time, lateness)
+	fleet.run()
+
+def measure(runner, robots):
+	""" Return the CPU time per wall time, and the mean and maximum lateness """
+	lateness = []
+	start_times = os.times()
+	start_time = time.time()
+	runner(robots, lateness)
+	end_times = os.times()
+	wall = time.time() - start_time
+	cpu = (end_times[0] - start_times[0]) + (end_times[1] - start_times[1])
+	return cpu / wall, sum(lateness) / len(lateness), max(lateness)
+
+print 'robots  runner   CPU [%]  robots/core  mean late [ms]  max late [ms]'
+for robots in [10, 100, 400, 1000, 2000]:
+	for name, runner in [('threads', run_threads), ('fleet', run_fleet)]:
+		load, mean_late, max_late = measure(runner, robots)
+		print '%6d  %-7s  %7.1f  %11d  %14.2f  %13.2f' % (robots, name, 100 * load, robots / load, 1e3 * mean_late, 1e3 * max_late)
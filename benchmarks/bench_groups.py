@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the cost of a phase switch, pausing the tasks of a phase and
+# resuming the ones of another, with pause_all_tasks_except() and
+# resume_tasks() and with task groups, for phases of various sizes.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+def behaviour():
+	while True:
+		yield WaitDuration(1)
+
+def switch_time(tasks, switches, grouped):
+	""" Return the time per phase switch """
+	sched = SimulatedTimeScheduler()
+	sched.log_sink = None
+	phases = [sched.new_group('phase %d' % i) for i in xrange(2)]
+	tids = [[sched.new_task(behaviour(), group=phase) for j in xrange(tasks)] for phase in phases]
+	sched.step()
+	if grouped:
+		sched.pause_group(phases[1])
+	else:
+		sched.pause_tasks(tids[1])
+	start_time = time.time()
+	for i in xrange(switches):
+		current, following = i % 2, (i + 1) % 2
+		if grouped:
+			sched.pause_group(phases[current])
+			sched.resume_group(phases[following])
+		else:
+			sched.pause_all_tasks_except(tids[following])
+			sched.resume_tasks(tids[following])
+	return (time.time() - start_time) / switches
+
+print 'tasks/phase  tasks [us/switch]  groups [us/switch]'
+for tasks in [10, 100, 1000, 10000]:
+	switches = max(10, 100000 // tasks)
+	print '%11d  %17.1f  %18.2f' % (tasks, 1e6 * switch_time(tasks, switches, False), 1e6 * switch_time(tasks, switches, True))
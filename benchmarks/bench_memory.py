@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the memory used per idle task, the number of yields per second of
+# tasks yielding Pass() or the shared PASS system call, and the number of
+# tasks created and terminated per second, with and without the freelist.
+
+import sys
+sys.path.append('..')
+from teer import *
+import gc
+import resource
+
+def idle():
+	yield WaitDuration(3600)
+
+def passer(count):
+	for i in xrange(count):
+		yield Pass()
+
+def shared_passer(count):
+	for i in xrange(count):
+		yield PASS
+
+def resident_memory():
+	""" Return the resident memory of this process in bytes """
+	with open('/proc/self/statm') as f:
+		return int(f.read().split()[1]) * resource.getpagesize()
+
+def memory_per_task(count):
+	""" Return the memory used per task not started yet, in bytes """
+	sched = Scheduler()
+	sched.log_sink = None
+	gc.collect()
+	start_memory = resident_memory()
+	for i in xrange(count):
+		sched.new_task(idle())
+	gc.collect()
+	return float(resident_memory() - start_memory) / count
+
+def yields_per_second(worker, tasks, count):
+	""" Return the number of yields per second """
+	sched = Scheduler()
+	sched.log_sink = None
+	for i in xrange(tasks):
+		sched.new_task(worker(count))
+	start_time = time.time()
+	sched.step()
+	return tasks * count / (time.time() - start_time)
+
+def create_exit_per_second(count):
+	""" Return the number of tasks created and terminated per second """
+	sched = Scheduler()
+	sched.log_sink = None
+	start_time = time.time()
+	for i in xrange(count // 100):
+		for j in xrange(100):
+			sched.new_task(passer(1))
+		sched.step()
+	return count / (time.time() - start_time)
+
+print 'memory per task: %.0f bytes' % memory_per_task(100000)
+print 'Pass():          %.0f yields/s' % yields_per_second(passer, 100, 10000)
+if 'PASS' in globals():
+	print 'PASS:            %.0f yields/s' % yields_per_second(shared_passer, 100, 10000)
+print 'create and exit: %.0f tasks/s' % create_exit_per_second(200000)
+if hasattr(Scheduler, 'TASK_FREELIST_SIZE'):
+	freelist_size = Scheduler.TASK_FREELIST_SIZE
+	Scheduler.TASK_FREELIST_SIZE = 0
+	print 'without freelist: %.0f tasks/s' % create_exit_per_second(200000)
+	Scheduler.TASK_FREELIST_SIZE = freelist_size
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the throughput of CPU-heavy work run by tasks with RunInPool,
+# for pools of 1, 2, 4 and 8 processes, compared to running it in the tasks.
+# The speedup is bounded by the number of cores of the machine.
+
+import sys
+sys.path.append('..')
+from teer import *
+import concurrent.futures
+import multiprocessing
+
+def work(n):
+	""" Some CPU-heavy work """
+	total = 0
+	for i in xrange(n):
+		total += i * i % 7
+	return total
+
+def inline_worker(jobs, n):
+	for i in xrange(jobs):
+		work(n)
+		yield Pass()
+
+def pool_worker(jobs, n):
+	for i in xrange(jobs):
+		yield RunInPool(work, n)
+
+def measure(worker, tasks, jobs, n, processes=None):
+	""" Return the number of jobs per second """
+	sched = TimerScheduler()
+	sched.log_sink = None
+	if processes is not None:
+		sched.process_pool = concurrent.futures.ProcessPoolExecutor(processes)
+		# start the processes before measuring
+		list(sched.process_pool.map(work, [0] * processes))
+	for i in xrange(tasks):
+		sched.new_task(worker(jobs, n))
+	start_time = time.time()
+	sched.run()
+	duration = time.time() - start_time
+	sched.shutdown_pools()
+	return tasks * jobs / duration
+
+tasks, jobs, n = 16, 8, 200000
+print 'cores on this machine: %d' % multiprocessing.cpu_count()
+print 'mode            jobs/s'
+print '%-14s  %6.1f' % ('in tasks', measure(inline_worker, tasks, jobs, n))
+for processes in [1, 2, 4, 8]:
+	print '%-14s  %6.1f' % ('%d processes' % processes, measure(pool_worker, tasks, jobs, n, processes))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the cost of sensor updates of a condition variable with many tasks
+# waiting for it to cross distinct thresholds, waiting with functions and with
+# indexed predicates. The level decreases by one per update, so each update
+# wakes a few tasks while the others keep waiting.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class EnergyScheduler(Scheduler):
+	energy_level = ConditionVariable(0)
+
+def lambda_waiter(sched, threshold):
+	yield WaitCondition(lambda: sched.energy_level < threshold)
+
+def predicate_waiter(sched, threshold):
+	yield WaitCondition(Var('energy_level') < threshold)
+
+def measure(waiter, tasks, levels):
+	""" Return the number of updates per second """
+	sched = EnergyScheduler()
+	sched.log_sink = None
+	sched.energy_level = levels
+	for i in xrange(tasks):
+		sched.new_task(waiter(sched, i * levels // tasks + 1))
+	sched.step()
+	start_time = time.time()
+	for level in xrange(levels - 1, -1, -1):
+		sched.energy_level = level
+		sched.step()
+	duration = time.time() - start_time
+	assert not sched.taskmap
+	return levels / duration
+
+levels = 1000
+print 'waiters  functions [updates/s]  predicates [updates/s]  speedup'
+for tasks in [100, 1000, 10000]:
+	functions = measure(lambda_waiter, tasks, levels)
+	predicates = measure(predicate_waiter, tasks, levels)
+	print '%7d  %22.0f  %23.0f  %7.1f' % (tasks, functions, predicates, predicates / functions)
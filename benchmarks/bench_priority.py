@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the latency from the wake-up of a monitor task by a condition
+# variable to its execution, while many low-priority tasks are always ready,
+# for a monitor of default priority, of higher priority, and with a deadline.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class AlarmScheduler(TimerScheduler):
+	alarm = ConditionVariable(0)
+
+def worker(work):
+	while True:
+		for j in xrange(work):
+			pass
+		yield Pass()
+
+def trigger(sched, count, period, set_times):
+	for i in xrange(count):
+		for j in xrange(period):
+			yield Pass()
+		set_times.append(time.time())
+		sched.alarm = i + 1
+
+def monitor(sched, count, set_times, latencies):
+	for i in xrange(count):
+		yield WaitCondition(lambda: sched.alarm > i)
+		latencies.append(time.time() - set_times[i])
+	sched.kill_all_tasks_except([sched.get_current_tid()])
+
+def measure(workers, count, **kwargs):
+	""" Return the sorted latencies """
+	sched = AlarmScheduler()
+	sched.log_sink = None
+	set_times = []
+	latencies = []
+	sched.new_task(monitor(sched, count, set_times, latencies), **kwargs)
+	for i in xrange(workers):
+		sched.new_task(worker(100))
+	sched.new_task(trigger(sched, count, 3, set_times))
+	sched.step()
+	latencies.sort()
+	return latencies
+
+print 'workers  monitor         mean [us]  median [us]  p99 [us]  max [us]'
+for workers in [100, 1000]:
+	for name, kwargs in [('default', {}), ('priority=1', {'priority': 1}), ('deadline=1ms', {'deadline': 0.001})]:
+		latencies = measure(workers, 100, **kwargs)
+		print '%7d  %-14s  %9.1f  %11.1f  %8.1f  %8.1f' % (workers, name, 1e6 * sum(latencies) / len(latencies),
+			1e6 * latencies[len(latencies) // 2], 1e6 * latencies[int(len(latencies) * 0.99)], 1e6 * latencies[-1])
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the cost of recording with an EventRecorder. Tasks with a control
+# loop setting a condition variable produce about 3 events per iteration (a
+# timer, a step and a condition variable set); the processor time used is
+# compared with and without a recorder, at a rate of about 50k events/s in
+# real time and as fast as possible in simulated time. The overhead is
+# relative to the processor time without recording, the target being 5%.
+# Runs with and without recording are short and alternated, so that both
+# see the same load of the machine, and the best of each is taken.
+
+import sys
+sys.path.append('..')
+from teer import *
+import os
+import tempfile
+
+DURATION = 1.
+REPEAT = 8
+SIMULATED_DURATION = 1.
+SIMULATED_REPEAT = 20
+
+class RobotTimerScheduler(TimerScheduler):
+	speed = ConditionVariable(0.)
+
+class RobotSimulatedTimeScheduler(SimulatedTimeScheduler):
+	speed = ConditionVariable(0.)
+
+def control(sched, period, end_time):
+	while sched.current_time() < end_time:
+		yield WaitDuration(period)
+		sched.speed = sched.current_time() - end_time
+
+def run(sched, tasks, period, duration, filename):
+	""" Run the tasks for duration, return the processor time used and the number of events recorded """
+	sched.log_sink = None
+	if filename is not None:
+		sched.recorder = EventRecorder(filename)
+	end_time = sched.current_time() + duration
+	for i in xrange(tasks):
+		sched.new_task(control(sched, period, end_time))
+	start_time = time.clock()
+	sched.run()
+	if filename is not None:
+		sched.recorder.close()
+	cpu = time.clock() - start_time
+	events = 0
+	if filename is not None:
+		log = EventLog(filename)
+		events = sum(1 for event in log)
+		log.close()
+	return cpu, events
+
+filename = os.path.join(tempfile.mkdtemp(), 'events.log')
+
+def compare(sched_class, duration, repeat):
+	""" Return the best processor time without and with recording, and the number of events recorded """
+	cpu = cpu_without = float('inf')
+	for i in xrange(repeat):
+		cpu_without = min(cpu_without, run(sched_class(), 100, 0.006, duration, None)[0])
+		run_cpu, events = run(sched_class(), 100, 0.006, duration, filename)
+		cpu = min(cpu, run_cpu)
+	return cpu_without, cpu, events
+
+def print_overhead(cpu_without, cpu, events):
+	print 'cost per event: %.2f us' % (1e6 * (cpu - cpu_without) / events)
+	overhead = 100 * (cpu - cpu_without) / cpu_without
+	print 'overhead: %.1f%% of the processor time without recording, %s the target of 5%%' % (overhead, 'within' if overhead < 5 else 'missing')
+
+print '* Real time, 100 tasks at 167 Hz *'
+cpu_without, cpu, events = compare(RobotTimerScheduler, DURATION, REPEAT)
+print 'events: %d/s, %.1f MB/s' % (events / DURATION, os.path.getsize(filename) / DURATION / 1e6)
+print 'processor time: %.1f%% of a core without recording, %.1f%% with recording' % (100 * cpu_without / DURATION, 100 * cpu / DURATION)
+print_overhead(cpu_without, cpu, events)
+
+print '* Simulated time, as fast as possible *'
+cpu_without, cpu, events = compare(RobotSimulatedTimeScheduler, SIMULATED_DURATION, SIMULATED_REPEAT)
+print 'events: %d in %.3f s, %.3f s without recording' % (events, cpu, cpu_without)
+print_overhead(cpu_without, cpu, events)
+os.remove(filename)
+os.rmdir(os.path.dirname(filename))
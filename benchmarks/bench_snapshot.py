@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the size of snapshots of schedulers with restartable tasks, and the
+# time to take and restore them, with tasks waiting for durations, conditions
+# and other tasks.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class RobotScheduler(SimulatedTimeScheduler):
+	energy = ConditionVariable(100)
+
+class Patrol(RestartableTask):
+	""" Wait a duration, several times """
+	def __init__(self, waypoints):
+		self.waypoints = waypoints
+	def run(self, sched):
+		while self.phase < self.waypoints:
+			self.phase += 1
+			yield WaitDuration(1)
+
+class LowEnergy(RestartableTask):
+	""" Wait for a condition """
+	def __init__(self, threshold):
+		self.threshold = threshold
+	def run(self, sched):
+		yield WaitCondition(self.condition(sched))
+	def condition(self, sched):
+		return lambda: sched.energy < self.threshold
+
+class Supervisor(RestartableTask):
+	""" Wait for another task """
+	def __init__(self, tid):
+		self.tid = tid
+	def run(self, sched):
+		if self.phase == 0:
+			self.phase = 1
+			yield WaitTask(self.tid)
+
+def populate(sched, count):
+	sched.log_sink = None
+	for i in xrange(count // 3):
+		tid = sched.new_task(Patrol(10))
+		sched.new_task(LowEnergy(i % 50))
+		sched.new_task(Supervisor(tid))
+	sched.step()
+
+def restore(data):
+	sched = RobotScheduler()
+	sched.log_sink = None
+	sched.restore(data)
+
+def best_of(f, repeat=5):
+	""" Return the shortest duration of f() """
+	durations = []
+	for i in xrange(repeat):
+		start_time = time.time()
+		f()
+		durations.append(time.time() - start_time)
+	return min(durations)
+
+print 'tasks  size [bytes]  bytes/task  snapshot [ms]  restore [ms]'
+for count in [1000, 10000]:
+	sched = RobotScheduler()
+	populate(sched, count)
+	data = sched.snapshot()
+	snapshot_time = best_of(sched.snapshot)
+	restore_time = best_of(lambda: restore(data))
+	print '%5d  %12d  %10.1f  %13.1f  %12.1f' % (len(sched.taskmap), len(data), float(len(data)) / len(sched.taskmap),
+		1000 * snapshot_time, 1000 * restore_time)
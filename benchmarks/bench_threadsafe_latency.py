@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Measure the latency from a condition variable set by another thread with
+# set_threadsafe() to the resumption of the task waiting on it, while the
+# scheduler sleeps waiting for a distant timer.
+
+import sys
+sys.path.append('..')
+from teer import *
+import threading
+import random
+
+class CounterTimerScheduler(TimerScheduler):
+	counter = ConditionVariable(0)
+
+class CounterAsyncioScheduler(AsyncioScheduler):
+	counter = ConditionVariable(0)
+
+def waiter(sched, count, set_times, latencies):
+	for i in xrange(count):
+		yield WaitCondition(lambda: sched.counter > i)
+		latencies.append(time.time() - set_times[i])
+
+def sleeper():
+	yield WaitDuration(3600)
+
+def writer(sched, count, set_times):
+	for i in xrange(count):
+		time.sleep(random.uniform(0.001, 0.003))
+		set_times.append(time.time())
+		sched.set_threadsafe('counter', i + 1)
+
+def measure(sched, count):
+	""" Return the sorted latencies """
+	set_times = []
+	latencies = []
+	sched.log_sink = None
+	sched.new_task(waiter(sched, count, set_times, latencies))
+	sleeper_tid = sched.new_task(sleeper())
+	thread = threading.Thread(target=writer, args=(sched, count, set_times))
+	thread.start()
+	def stop():
+		while len(latencies) < count:
+			time.sleep(0.01)
+		sched.call_soon_threadsafe(sched.kill_task, sleeper_tid)
+	threading.Thread(target=stop).start()
+	sched.run()
+	thread.join()
+	sched.close()
+	latencies.sort()
+	return latencies
+
+print 'scheduler         mean [us]  median [us]  p99 [us]  max [us]'
+for name, sched_class in [('TimerScheduler', CounterTimerScheduler), ('AsyncioScheduler', CounterAsyncioScheduler)]:
+	latencies = measure(sched_class(), 1000)
+	print '%-16s  %9.1f  %11.1f  %8.1f  %8.1f' % (name, 1e6 * sum(latencies) / len(latencies),
+		1e6 * latencies[len(latencies) // 2], 1e6 * latencies[int(len(latencies) * 0.99)], 1e6 * latencies[-1])
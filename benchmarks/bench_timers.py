@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Compare the heap and the timing wheel timer queues with many periodic
+# timers, as created by tasks using Rate or WaitDuration in a loop, and
+# with the cancellation of timers, as done when killing tasks.
+#
+# The heap is faster up to about 10k timers, the wheel only pays off from
+# about 100k timers, where it fires about 50% more timers per second.
+
+import sys
+sys.path.append('..')
+from teer import *
+import random
+
+def periodic(queue, timers, duration):
+	""" Return the time to run periodic timers at 10 to 1000 Hz for duration seconds of virtual time """
+	random.seed(0)
+	now = 0.
+	queue.pop_due(now)
+	fired = [0]
+	def rearm(period):
+		fired[0] += 1
+		queue.add(now + period, rearm, (period,))
+	for i in xrange(timers):
+		period = 1. / random.choice([10, 50, 100, 500, 1000])
+		queue.add(now + random.random() * period, rearm, (period,))
+	start_time = time.time()
+	while now < duration:
+		now += 0.001
+		for timer in queue.pop_due(now):
+			timer.f(*timer.args)
+	return time.time() - start_time, fired[0]
+
+def churn(queue, timers):
+	""" Return the time to add and then cancel timers """
+	random.seed(0)
+	queue.pop_due(0.)
+	start_time = time.time()
+	handles = [queue.add(random.random() * 10., None) for i in xrange(timers)]
+	for handle in handles:
+		queue.cancel(handle)
+	assert not queue
+	return time.time() - start_time
+
+print 'timers  backend  periodic [s]  fired/s    add+cancel [s]'
+for timers in [1000, 10000, 100000]:
+	duration = 2. / (timers / 1000)
+	for name, queue_class in [('heap', HeapTimerQueue), ('wheel', WheelTimerQueue)]:
+		periodic_time, fired = periodic(queue_class(), timers, duration)
+		churn_time = churn(queue_class(), timers)
+		print '%6d  %7s  %12.3f  %9.0f  %14.3f' % (timers, name, periodic_time, fired / periodic_time, churn_time)
@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Benchmark suite of the main paths of the scheduler, writing its results as
+# JSON and comparing them to the results of a previous run:
+#
+#   python suite.py --output before.json
+#   (change teer.py)
+#   python suite.py --compare before.json
+#
+# With --compare, the exit status is 1 if a result regressed by more than the
+# tolerance. Each measure is the best of several runs, with the garbage
+# collector disabled while timing, and random numbers use fixed seeds.
+
+import sys
+sys.path.append('..')
+from teer import *
+import argparse
+import gc
+import os
+import tempfile
+import platform
+import random
+
+class LevelScheduler(SimulatedTimeScheduler):
+	level = ConditionVariable(0)
+
+def new_scheduler(**kwargs):
+	""" Return a LevelScheduler that does not log """
+	sched = LevelScheduler(**kwargs)
+	sched.log_sink = None
+	return sched
+
+# List of (name, function), functions returning lists of (name, value, unit, higher is better)
+benchmarks = []
+
+def benchmark(f):
+	""" Register a benchmark function """
+	benchmarks.append((f.__name__, f))
+	return f
+
+def best_time(setup, run, repeat, clock=time.time):
+	""" Return the shortest time of run(setup()) over repeat runs, measured with clock """
+	best = None
+	for i in xrange(repeat):
+		state = setup()
+		gc.collect()
+		gc.disable()
+		try:
+			start_time = clock()
+			run(state)
+			duration = clock() - start_time
+		finally:
+			gc.enable()
+		if best is None or duration < best:
+			best = duration
+	return best
+
+def passer(count):
+	for i in xrange(count):
+		yield PASS
+
+def waiter(tid):
+	yield WaitTask(tid)
+
+def sleeper():
+	yield WaitDuration(3600)
+
+@benchmark
+def yields(scale, repeat):
+	""" Yields per second through step() """
+	tasks, count = 100, 1000 * scale
+	def setup():
+		sched = new_scheduler()
+		for i in xrange(tasks):
+			sched.new_task(passer(count))
+		return sched
+	duration = best_time(setup, lambda sched: sched.step(), repeat)
+	return [('yields', tasks * count / duration, 'yields/s', True)]
+
+@benchmark
+def create_exit(scale, repeat):
+	""" Tasks created and terminated per second, and waiters woken per second by an exit """
+	count = 1000 * scale
+	def create_run(sched):
+		for i in xrange(count):
+			sched.new_task(passer(1))
+		sched.step()
+	duration = best_time(new_scheduler, create_run, repeat)
+	results = [('create_exit', count / duration, 'tasks/s', True)]
+	for waiters in [10, 1000]:
+		def setup():
+			sched = new_scheduler()
+			tid = sched.new_task(sleeper())
+			for i in xrange(waiters):
+				sched.new_task(waiter(tid))
+			sched.step()
+			return sched, tid
+		def exit(state):
+			sched, tid = state
+			sched.kill_task(tid)
+			sched.step()
+		duration = best_time(setup, exit, repeat)
+		results.append(('exit_with_%d_waiters' % waiters, waiters / duration, 'waiters/s', True))
+	return results
+
+@benchmark
+def condition_wake(scale, repeat):
+	""" Updates per second of a condition variable with waiters on distinct thresholds, each update waking a few """
+	updates = 100 * scale
+	def function_waiter(sched, threshold):
+		yield WaitCondition(lambda: sched.level < threshold)
+	def predicate_waiter(sched, threshold):
+		yield WaitCondition(Var('level') < threshold)
+	results = []
+	for waiters in [10, 100, 1000]:
+		for name, waiter in [('function', function_waiter), ('predicate', predicate_waiter)]:
+			def setup():
+				sched = new_scheduler()
+				sched.level = updates
+				for i in xrange(waiters):
+					sched.new_task(waiter(sched, i * updates // waiters + 1))
+				sched.step()
+				return sched
+			def update(sched):
+				for level in xrange(updates - 1, -1, -1):
+					sched.level = level
+					sched.step()
+			duration = best_time(setup, update, repeat)
+			results.append(('condition_%s_%d_waiters' % (name, waiters), updates / duration, 'updates/s', True))
+	return results
+
+@benchmark
+def timer_churn(scale, repeat):
+	""" Timers fired per second with tasks waiting for random durations, and timers added and cancelled per second """
+	tasks, duration = 1000, 0.1 * scale
+	def periodic(sched):
+		while True:
+			yield WaitDuration(random.uniform(0.001, 0.01))
+	results = []
+	for name, queue_class in [('heap', HeapTimerQueue), ('wheel', WheelTimerQueue)]:
+		fired = []
+		def setup():
+			random.seed(0)
+			sched = new_scheduler(timer_queue=queue_class())
+			for i in xrange(tasks):
+				sched.new_task(periodic(sched))
+			sched.step()
+			return sched
+		def run(sched):
+			sched.run_until(duration)
+			fired.append(sched.timer_cb.counter - tasks)
+		run_time = best_time(setup, run, repeat)
+		results.append(('timers_fired_%s' % name, fired[0] / run_time, 'timers/s', True))
+		count = 10000 * scale
+		def setup_queue():
+			random.seed(0)
+			queue = queue_class()
+			queue.pop_due(0.)
+			return queue
+		def add_cancel(queue):
+			for handle in [queue.add(random.random() * 10., None) for i in xrange(count)]:
+				queue.cancel(handle)
+		churn_time = best_time(setup_queue, add_cancel, repeat)
+		results.append(('timers_add_cancel_%s' % name, count / churn_time, 'timers/s', True))
+	return results
+
+@benchmark
+def pause_resume(scale, repeat):
+	""" Tasks paused and resumed per second, one by one and in a group """
+	tasks = 1000 * scale
+	def setup():
+		sched = new_scheduler()
+		tids = [sched.new_task(sleeper()) for i in xrange(tasks)]
+		sched.step()
+		return sched, tids
+	def pause_resume(state):
+		sched, tids = state
+		for i in xrange(10):
+			sched.pause_tasks(tids)
+			sched.resume_tasks(tids)
+	duration = best_time(setup, pause_resume, repeat)
+	results = [('pause_resume', 10 * tasks / duration, 'tasks/s', True)]
+	# with all the tasks in a group, ready ones are parked and resumed
+	def setup_group():
+		sched = new_scheduler()
+		group = sched.new_group('phase')
+		for i in xrange(tasks):
+			sched.new_task(passer(1000), group=group)
+		return sched, group
+	def pause_resume_group(state):
+		sched, group = state
+		for i in xrange(10):
+			sched.pause_group(group)
+			sched.step()
+			sched.resume_group(group)
+	duration = best_time(setup_group, pause_resume_group, repeat)
+	results.append(('pause_resume_ready_group', 10 * tasks / duration, 'tasks/s', True))
+	return results
+
+@benchmark
+def log_sinks(scale, repeat):
+	""" Tasks created and terminated per second with logging disabled, filtered out and kept in memory, relative to no logging code at all """
+	count = 1000 * scale
+	class UnloggedScheduler(SimulatedTimeScheduler):
+		# the baseline, without calls to the logging code
+		def _log_task_created(self, task):
+			pass
+		def _log_task_terminated(self, task):
+			pass
+	def create_run(sched):
+		for i in xrange(count):
+			sched.new_task(passer(1))
+		sched.step()
+	baseline = best_time(UnloggedScheduler, create_run, repeat)
+	results = []
+	for name, make_sink in [
+		('disabled', lambda: None),
+		('filtered', lambda: RingBufferLogSink(level=LogSink.WARNING)),
+		('ring_buffer', lambda: RingBufferLogSink()),
+	]:
+		def setup():
+			sched = SimulatedTimeScheduler()
+			sched.log_sink = make_sink()
+			return sched
+		duration = best_time(setup, create_run, repeat)
+		results.append(('logging_%s_speed' % name, baseline / duration, 'x baseline', True))
+	return results
+
+@benchmark
+def profiler(scale, repeat):
+	""" Yields per second through step() with the profiler, and their speed relative to no profiler """
+	tasks, count = 100, 100 * scale
+	results = []
+	durations = {}
+	for name, make_profiler in [('off', lambda: None), ('on', Profiler), ('trace', lambda: Profiler(trace_capacity=10000))]:
+		def setup():
+			sched = new_scheduler()
+			sched.profiler = make_profiler()
+			for i in xrange(tasks):
+				sched.new_task(passer(count))
+			return sched
+		durations[name] = best_time(setup, lambda sched: sched.step(), repeat)
+		results.append(('profiler_%s_yields' % name, tasks * count / durations[name], 'yields/s', True))
+	for name in ['on', 'trace']:
+		results.append(('profiler_%s_speed' % name, durations['off'] / durations[name], 'x off', True))
+	return results
+
+@benchmark
+def recorder(scale, repeat):
+	""" Processor time per event recorded, and the overhead relative to the processor time without recording, the target being 5% """
+	tasks, duration = 100, 0.05 * scale
+	# each iteration records a timer, a step and a condition variable set
+	def control(sched):
+		while sched.current_time() < duration:
+			yield WaitDuration(0.006)
+			sched.level = sched.current_time()
+	fd, filename = tempfile.mkstemp()
+	os.close(fd)
+	def run_with(make_recorder):
+		def setup():
+			sched = new_scheduler()
+			sched.recorder = make_recorder()
+			for i in xrange(tasks):
+				sched.new_task(control(sched))
+			return sched
+		def run(sched):
+			sched.run()
+			if sched.recorder is not None:
+				sched.recorder.close()
+		# processor time, including the one of the writing thread
+		return best_time(setup, run, 1, time.clock)
+	try:
+		# many short runs alternated, so that both see the same load of the machine
+		without = with_recorder = float('inf')
+		for i in xrange(8 * repeat):
+			without = min(without, run_with(lambda: None))
+			with_recorder = min(with_recorder, run_with(lambda: EventRecorder(filename)))
+		log = EventLog(filename)
+		events = sum(1 for event in log)
+		log.close()
+	finally:
+		os.remove(filename)
+	return [('recorder_event_cost', 1e6 * (with_recorder - without) / events, 'us/event', False),
+		('recorder_overhead', 100 * (with_recorder - without) / without, '% of processor time', False)]
+
+@benchmark
+def memory(scale, repeat):
+	""" Memory per idle task, waiting for a duration """
+	tasks = 10000 * scale
+	def resident_memory():
+		with open('/proc/self/statm') as f:
+			return int(f.read().split()[1]) * resource.getpagesize()
+	try:
+		import resource
+		resident_memory()
+	except (ImportError, IOError):
+		return []
+	best = None
+	for i in xrange(repeat):
+		sched = new_scheduler()
+		gc.collect()
+		start_memory = resident_memory()
+		for j in xrange(tasks):
+			sched.new_task(sleeper())
+		sched.step()
+		gc.collect()
+		per_task = float(resident_memory() - start_memory) / tasks
+		del sched
+		if best is None or per_task < best:
+			best = per_task
+	return [('memory_per_idle_task', best, 'bytes', False)]
+
+def compare(results, baseline, tolerance):
+	""" Print the comparison of results to baseline, return the list of names of regressions """
+	regressions = []
+	print '%-32s %14s %14s %8s' % ('benchmark', 'baseline', 'current', 'ratio')
+	for name, result in sorted(results.iteritems()):
+		base = baseline.get(name)
+		if base is None:
+			print '%-32s %14s %14.1f %8s' % (name, '-', result['value'], 'new')
+			continue
+		ratio = result['value'] / base['value'] if base['value'] else float('inf')
+		# ratio of improvement, below 1 if worse
+		improvement = ratio if result['higher_is_better'] else 1. / ratio
+		flag = ''
+		if improvement < 1. - tolerance:
+			flag = ' REGRESSION'
+			regressions.append(name)
+		print '%-32s %14.1f %14.1f %8.2f%s' % (name, base['value'], result['value'], ratio, flag)
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark suite of the scheduler')
+	parser.add_argument('--output', help='file to write the results to, as JSON')
+	parser.add_argument('--compare', help='JSON file of previous results to compare to')
+	parser.add_argument('--tolerance', type=float, default=0.1, help='relative slowdown tolerated when comparing (default: 0.1)')
+	parser.add_argument('--scale', type=int, default=10, help='size of the workloads (default: 10)')
+	parser.add_argument('--repeat', type=int, default=5, help='number of runs per measure (default: 5)')
+	parser.add_argument('--only', action='append', help='run only this benchmark, can be repeated')
+	args = parser.parse_args()
+	results = {}
+	for name, f in benchmarks:
+		if args.only and name not in args.only:
+			continue
+		sys.stderr.write('running %s\n' % name)
+		for result_name, value, unit, higher_is_better in f(args.scale, args.repeat):
+			results[result_name] = { 'value': value, 'unit': unit, 'higher_is_better': higher_is_better }
+	report = {
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'scale': args.scale,
+		'results': results,
+	}
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(report, f, indent=2, sort_keys=True)
+	if args.compare:
+		with open(args.compare) as f:
+			baseline = json.load(f)
+		if baseline.get('scale') != args.scale:
+			sys.stderr.write('warning: the baseline was run with scale %s\n' % baseline.get('scale'))
+		regressions = compare(results, baseline['results'], args.tolerance)
+		if regressions:
+			print '%d regressions' % len(regressions)
+			sys.exit(1)
+	elif not args.output:
+		json.dump(report, sys.stdout, indent=2, sort_keys=True)
+		print
+
+if __name__ == '__main__':
+	main()
@@ -32,8 +32,25 @@
 from collections import deque
 import time
 import heapq
+import math
+import operator
 import copy
-import inspect
+import types
+import functools
+import os
+import errno
+import select
+import sys
+import threading
+import Queue
+import json
+import bisect
+import struct
+import marshal
+import itertools
+import mmap
+import cPickle
+import gc
 
 # ------------------------------------------------------------
 #                       === Tasks ===
@@ -42,74 +59,1358 @@ class Task(object):
 	""" The object representing a task/co-routine in the scheduler """
 	WAIT_ANY = 1
 	WAIT_ALL = 2
+	# States
+	READY = 1           # in the ready queue
+	WAITING = 2         # running or in a system call
+	PAUSED_READY = 3    # paused, will be put in the ready queue when resumed
+	PAUSED_WAIT = 4     # paused while in a system call
+	DONE = 5            # terminated
+	# Transitions of states when pausing and resuming
+	PAUSE = { READY: PAUSED_READY, WAITING: PAUSED_WAIT }
+	RESUME = { PAUSED_READY: READY, PAUSED_WAIT: WAITING }
+	# Value of throwval to start the target ignoring sendval, for restored tasks resumed by a system call
+	START = object()
 	taskid = 0
-	def __init__(self,target):
-		""" Initialize """
-		Task.taskid += 1
-		self.tid     = Task.taskid   # Task ID
+	__slots__ = ('tid', 'target', 'name', 'sendval', 'throwval', 'waitmode', 'state', 'queued', 'timer',
+		'condition', 'future', 'channel', 'priority', 'deadline', 'overruns', 'restartable', 'group')
+	def __init__(self,target,tid=None):
+		""" Initialize, with a new identifier unless tid is given """
+		if tid is None:
+			Task.taskid += 1
+			tid = Task.taskid
+		elif tid > Task.taskid:
+			Task.taskid = tid
+		self.tid     = tid           # Task ID
 		self.target  = target        # Target coroutine
+		self.name    = target.__name__  # Name used in logs
 		self.sendval = None          # Value to send
+		self.throwval = None         # Exception to raise in the task instead, if any
 		self.waitmode = Task.WAIT_ANY
+		self.state   = Task.WAITING  # State, see above
+		self.queued  = False         # Whether an entry for this task is in the ready queue
+		self.timer   = None          # Pending timer, if waiting for a duration
+		self.condition = None        # Entry in cond_waiting or PredicateWait, if waiting for a condition
+		self.future  = None          # Future, if waiting for one
+		self.channel = None          # Channel the task is parked on, if blocked sending, receiving or reserving
+		self.priority = 0            # Tasks of higher priorities run first
+		self.deadline = None         # Relative deadline in seconds, for earliest-deadline-first scheduling
+		self.overruns = 0            # Number of slices longer than the overrun duration of the scheduler
+		self.restartable = None      # RestartableTask running in target, if any
+		self.group   = None          # TaskGroup of the task, if any
 	def __repr__(self):
 		""" Debug information on a task """
-		return 'Task ' + str(self.tid) + ' (' + self.target.__name__ + ') @ ' + str(id(self))
+		return 'Task ' + str(self.tid) + ' (' + self.name + ') @ ' + str(id(self))
 	def run(self):
 		""" Run a task until it hits the next yield statement"""
+		if self.throwval is not None:
+			exception = self.throwval
+			self.throwval = None
+			if exception is Task.START:
+				return self.target.next()
+			return self.target.throw(exception)
 		return self.target.send(self.sendval)
 
+class TaskGroup(object):
+	""" A group of tasks, possibly within a parent group, paused, resumed and killed as a whole, see Scheduler.new_group().
+	
+	Pausing a group only sets a flag. When a task of a paused group, or of
+	a group within it, is taken from the ready queue, it is parked in the
+	paused group until it is resumed.
+	
+	A group is only in the children of its parent while it or a group within
+	it has tasks, so that groups left empty or killed do not accumulate.
+	Their statistics are then counted in the parent, until given new tasks.
+	"""
+	def __init__(self, name, parent=None):
+		""" Initialize """
+		self.name = name
+		self.parent = parent
+		self.children = []      # groups within this one having tasks
+		self.attached = False   # whether this group is in the children of its parent
+		self.tids = set()       # identifiers of the tasks of this group, not of the groups within it
+		self.paused = False
+		self.parked = deque()   # ready tasks of this group and the ones within it, while paused
+		# Statistics
+		self.created = 0        # number of tasks created
+		self.terminated = 0     # number of tasks terminated or killed
+		self.slices = 0         # number of slices run by tasks
+	def __repr__(self):
+		""" Debug information on a group """
+		return 'TaskGroup ' + self.name + (' (paused)' if self.paused else '')
+	def paused_group(self):
+		""" Return the group pausing this one, itself or a parent, None if not paused """
+		group = self
+		while group is not None:
+			if group.paused:
+				return group
+			group = group.parent
+		return None
+	def all_tids(self):
+		""" Return the list of identifiers of the tasks of this group and of the groups within it """
+		tids = list(self.tids)
+		for child in self.children:
+			tids.extend(child.all_tids())
+		return tids
+	def stats(self):
+		""" Return the statistics of this group, including the groups within it, as a dict """
+		stats = { 'name': self.name, 'paused': self.paused_group() is not None, 'tasks': len(self.tids),
+			'created': self.created, 'terminated': self.terminated, 'slices': self.slices }
+		for child in self.children:
+			child_stats = child.stats()
+			for key in ('tasks', 'created', 'terminated', 'slices'):
+				stats[key] += child_stats[key]
+		return stats
+	def _attach(self):
+		""" Add this group to the children of its parent, and the parent to its own, if they are not there """
+		parent = self.parent
+		if parent is not None and not self.attached:
+			parent._attach()
+			parent.children.append(self)
+			self.attached = True
+			# the statistics of this group were counted in the parent while detached
+			parent.created -= self.created
+			parent.terminated -= self.terminated
+			parent.slices -= self.slices
+	def _detach(self):
+		""" Remove this empty group from the children of its parent, and the parent if it becomes empty too """
+		parent = self.parent
+		if parent is not None and self.attached:
+			parent.children.remove(self)
+			self.attached = False
+			parent.created += self.created
+			parent.terminated += self.terminated
+			parent.slices += self.slices
+			if not parent.tids and not parent.children:
+				parent._detach()
+
+class RestartableTask(object):
+	""" Parent of tasks that can be saved in a snapshot of the scheduler and restored, see Scheduler.snapshot().
+	
+	Generators cannot be saved, so a restartable task keeps its progress in
+	its attributes, which must be serializable by marshal, phase recording
+	where it is. Its class must be importable. On restore, the object is
+	recreated with its attributes and run() is called again, so it must
+	continue from them. The waits of a task for a duration, for other tasks
+	and its pause state are restored by the scheduler, so a task must update
+	its attributes before yielding a system call and continue after it.
+	Waits for conditions cannot be saved, so condition() is called to issue
+	it again. Waits for futures cannot be saved at all.
+	"""
+	phase = 0
+	def run(self, sched):
+		""" Return the generator running the task from its current attributes """
+		raise NotImplementedError('restartable tasks must implement run()')
+	def condition(self, sched):
+		""" Return the condition waited for in the current phase, when restoring a task waiting for one """
+		raise NotImplementedError('restartable tasks waiting for conditions must implement condition()')
+
 # ------------------------------------------------------------
 #                === Conditional Variables ===
 # ------------------------------------------------------------
 class ConditionVariable(object):
-	""" The basic conditional variable """
+	""" The basic conditional variable, its value is stored in each scheduler instance """
+	# Types of values for which an assignment of an equal value does not re-evaluate conditions.
+	# Other values, such as lists, might have been modified in place before being re-assigned.
+	unchanged_types = frozenset([bool, int, long, float, complex, str, unicode, type(None)])
 	def __init__(self, initval=None):
 		""" Initialize """
-		self.val = initval
-		self.myname = None
+		self.initval = initval
+		self.myname = None  # bound when the scheduler class is created
 	def __get__(self, obj, objtype):
-		""" Return the value """
-		return self.val
+		""" Return the value, or this variable if accessed from the class """
+		if obj is None:
+			return self
+		return obj.__dict__.get(self.myname, self.initval)
 	def __set__(self, obj, val):
-		""" Set a value, evaluate conditions for tasks waiting on this variable """
-		self.val = val
-		self._set_name(type(obj))
-		obj._test_conditions(self.myname)
-	def _set_name(self, cls, top_level=True):
-		""" if unknown, retrieve my own name using introspection """
-		if self.myname is None:
-			members = cls.__dict__
-			# first look into members
-			for name, value in members.iteritems():
-				if value is self:
-					self.myname = name
+		""" Set a value, evaluate conditions for tasks waiting on this variable if the value changed """
+		name = self.myname
+		values = obj.__dict__
+		oldval = values.get(name, self.initval)
+		# recorded first, so that a value failing to be recorded is not stored either
+		recorder = obj.recorder
+		if recorder is not None:
+			recorder.condition_set(obj.current_time(), name, obj.current_task, val)
+		values[name] = val
+		if type(val) is type(oldval) and type(val) in ConditionVariable.unchanged_types and val == oldval:
+			return
+		obj._test_conditions(name)
+
+class ArrayConditionVariable(ConditionVariable):
+	""" A condition variable holding a NumPy array, each scheduler instance gets its own array filled with initval.
+	
+	Tasks wait on elements with predicates such as Var('battery')[i] < 10,
+	which are all tested by one vectorized comparison per operator when the
+	array is assigned. Modifying the array in place does not wake tasks up,
+	assign it again afterwards. Its values are not supported by snapshot().
+	"""
+	def __init__(self, shape, initval=0, dtype=float):
+		""" Initialize """
+		super(ArrayConditionVariable, self).__init__(initval)
+		self.shape = shape
+		self.dtype = dtype
+	def __get__(self, obj, objtype):
+		""" Return the array, or this variable if accessed from the class """
+		if obj is None:
+			return self
+		values = obj.__dict__
+		array = values.get(self.myname)
+		if array is None:
+			import numpy
+			array = values[self.myname] = numpy.full(self.shape, self.initval, self.dtype)
+		return array
+
+# ------------------------------------------------------------
+#                      === Predicates ===
+# ------------------------------------------------------------
+class Predicate(object):
+	""" Parent of the predicates on condition variables, built by comparing Var objects to constants and combined with & and |.
+	
+	Unlike functions, the scheduler indexes the thresholds of predicates,
+	so that writing a variable wakes exactly the tasks whose thresholds
+	are crossed, without evaluating the conditions of the others.
+	"""
+	def __and__(self, other):
+		return And(self, other)
+	def __or__(self, other):
+		return Or(self, other)
+	def evaluate(self, sched):
+		""" Return whether the predicate is true for the variables of sched """
+		raise NotImplementedError('predicates must implement evaluate()')
+	def leaves(self):
+		""" Return the list of thresholds of this predicate """
+		raise NotImplementedError('predicates must implement leaves()')
+
+class Var(object):
+	""" A condition variable by name, compare it to a constant to build a Threshold, index it to get an Element """
+	def __init__(self, name):
+		""" Initialize """
+		self.name = name
+	def __repr__(self):
+		return 'Var(%r)' % self.name
+	def __getitem__(self, index):
+		return Element(self.name, index)
+	def __lt__(self, value):
+		return self._threshold('<', value)
+	def __le__(self, value):
+		return self._threshold('<=', value)
+	def __gt__(self, value):
+		return self._threshold('>', value)
+	def __ge__(self, value):
+		return self._threshold('>=', value)
+	def __eq__(self, value):
+		return self._threshold('==', value)
+	def __ne__(self, value):
+		return self._threshold('!=', value)
+	def _threshold(self, op, value):
+		return Threshold(self.name, op, value)
+
+class Element(Var):
+	""" An element of an array condition variable, compare it to a constant to build an ElementThreshold """
+	def __init__(self, name, index):
+		""" Initialize """
+		super(Element, self).__init__(name)
+		self.index = index
+	def __repr__(self):
+		return 'Var(%r)[%r]' % (self.name, self.index)
+	def __getitem__(self, index):
+		raise TypeError('elements of condition variables cannot be indexed')
+	def _threshold(self, op, value):
+		return ElementThreshold(self.name, self.index, op, value)
+
+class Threshold(Predicate):
+	""" A predicate comparing a condition variable to a constant """
+	OPERATORS = { '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '==': operator.eq, '!=': operator.ne }
+	def __init__(self, name, op, value):
+		""" Initialize """
+		if isinstance(value, (Var, Predicate)):
+			raise TypeError('predicates compare condition variables to constants')
+		self.name = name
+		self.op = op
+		self.value = value
+		self.compare = Threshold.OPERATORS[op]
+	def __repr__(self):
+		return 'Var(%r) %s %r' % (self.name, self.op, self.value)
+	def evaluate(self, sched):
+		return self.compare(getattr(sched, self.name), self.value)
+	def leaves(self):
+		return [self]
+	def new_index(self):
+		""" Return an empty index for thresholds of this kind """
+		return ThresholdIndex()
+
+class ElementThreshold(Threshold):
+	""" A predicate comparing an element of an array condition variable to a constant """
+	def __init__(self, name, index, op, value):
+		""" Initialize """
+		super(ElementThreshold, self).__init__(name, op, value)
+		self.index = index
+	def __repr__(self):
+		return 'Var(%r)[%r] %s %r' % (self.name, self.index, self.op, self.value)
+	def evaluate(self, sched):
+		return self.compare(getattr(sched, self.name)[self.index], self.value)
+	def new_index(self):
+		return ArrayThresholdIndex()
+
+class And(Predicate):
+	""" A predicate true if all its predicates are true """
+	def __init__(self, *predicates):
+		""" Initialize """
+		self.predicates = []
+		for predicate in predicates:
+			if isinstance(predicate, And):
+				self.predicates.extend(predicate.predicates)
+			else:
+				self.predicates.append(predicate)
+	def __repr__(self):
+		return '(' + ') & ('.join(map(repr, self.predicates)) + ')'
+	def evaluate(self, sched):
+		for predicate in self.predicates:
+			if not predicate.evaluate(sched):
+				return False
+		return True
+	def leaves(self):
+		return [leaf for predicate in self.predicates for leaf in predicate.leaves()]
+
+class Or(Predicate):
+	""" A predicate true if any of its predicates is true """
+	def __init__(self, *predicates):
+		""" Initialize """
+		self.predicates = []
+		for predicate in predicates:
+			if isinstance(predicate, Or):
+				self.predicates.extend(predicate.predicates)
+			else:
+				self.predicates.append(predicate)
+	def __repr__(self):
+		return '(' + ') | ('.join(map(repr, self.predicates)) + ')'
+	def evaluate(self, sched):
+		for predicate in self.predicates:
+			if predicate.evaluate(sched):
+				return True
+		return False
+	def leaves(self):
+		return [leaf for predicate in self.predicates for leaf in predicate.leaves()]
+
+class PredicateWait(object):
+	""" A task waiting for a predicate, with the entries of its false thresholds in the threshold indexes """
+	__slots__ = ('predicate', 'task', 'entries')
+	def __init__(self, predicate, task):
+		""" Initialize """
+		self.predicate = predicate
+		self.task = task
+		self.entries = []       # list of (index, threshold, entry)
+
+class ThresholdIndex(object):
+	""" The thresholds waited for on a condition variable.
+	
+	Ordering thresholds are kept sorted, so that the ones a new value
+	satisfies form a prefix or a suffix found by bisection, in O(log n + k).
+	Equality thresholds are hashed and only inequalities are tested one by
+	one. Entries are (threshold value, sequence number, PredicateWait).
+	"""
+	def __init__(self):
+		""" Initialize """
+		self.sorted = { '<': [], '<=': [], '>': [], '>=': [] }   # op => list of entries, by increasing threshold
+		self.equal = {}         # threshold value => list of entries for ==
+		self.unequal = []       # entries for !=
+		self.counter = 0        # sequence number of the next entry
+		self.count = 0          # number of entries
+	def __len__(self):
+		""" Return the number of entries """
+		return self.count
+	def add(self, threshold, wait):
+		""" Add an entry for wait until threshold is satisfied, return it """
+		entry = (threshold.value, self.counter, wait)
+		self.counter += 1
+		self.count += 1
+		op = threshold.op
+		if op == '==':
+			self.equal.setdefault(threshold.value, []).append(entry)
+		elif op == '!=':
+			self.unequal.append(entry)
+		else:
+			bisect.insort(self.sorted[op], entry)
+		return entry
+	def remove(self, threshold, entry):
+		""" Remove an entry if still present """
+		op = threshold.op
+		if op == '==':
+			entries = self.equal.get(entry[0], ())
+			if entry in entries:
+				entries.remove(entry)
+				if not entries:
+					del self.equal[entry[0]]
+				self.count -= 1
+		elif op == '!=':
+			if entry in self.unequal:
+				self.unequal.remove(entry)
+				self.count -= 1
+		else:
+			entries = self.sorted[op]
+			i = bisect.bisect_left(entries, entry[:2])
+			if i < len(entries) and entries[i][1] == entry[1]:
+				del entries[i]
+				self.count -= 1
+	def crossed(self, value):
+		""" Remove and return the entries whose thresholds value satisfies """
+		if not self.count:
+			return []
+		entries = self.sorted['<']
+		i = bisect.bisect_right(entries, (value, sys.maxint))
+		crossed = entries[i:]
+		del entries[i:]
+		entries = self.sorted['<=']
+		i = bisect.bisect_left(entries, (value, -1))
+		crossed.extend(entries[i:])
+		del entries[i:]
+		entries = self.sorted['>']
+		i = bisect.bisect_left(entries, (value, -1))
+		crossed.extend(entries[:i])
+		del entries[:i]
+		entries = self.sorted['>=']
+		i = bisect.bisect_right(entries, (value, sys.maxint))
+		crossed.extend(entries[:i])
+		del entries[:i]
+		if self.equal:
+			try:
+				crossed.extend(self.equal.pop(value, ()))
+			except TypeError:
+				# unhashable values equal no threshold
+				pass
+		if self.unequal:
+			remaining = []
+			for entry in self.unequal:
+				(crossed if entry[0] != value else remaining).append(entry)
+			self.unequal = remaining
+		self.count -= len(crossed)
+		return crossed
+
+class ArrayThresholdIndex(object):
+	""" The element thresholds waited for on an array condition variable.
+	
+	For each operator, the element indices and threshold values of the
+	entries are kept as NumPy arrays, so that a new array is compared to
+	all thresholds of an operator at once. Entries are lists of (threshold
+	value, sequence number, PredicateWait, element index); removed entries
+	have no PredicateWait and are dropped when they are half of the entries.
+	"""
+	def __init__(self):
+		""" Initialize """
+		import numpy
+		self.numpy = numpy
+		self.columns = {}       # op => [list of entries, array of element indices, array of threshold values]
+		self.counter = 0        # sequence number of the next entry
+		self.count = 0          # number of entries
+		self.removed = 0        # number of removed entries still in the columns
+	def __len__(self):
+		""" Return the number of entries """
+		return self.count
+	def add(self, threshold, wait):
+		""" Add an entry for wait until threshold is satisfied, return it """
+		entry = [threshold.value, self.counter, wait, threshold.index]
+		self.counter += 1
+		self.count += 1
+		column = self.columns.get(threshold.op)
+		if column is None:
+			column = self.columns[threshold.op] = [[], None, None]
+		column[0].append(entry)
+		# the arrays are rebuilt when next compared
+		column[1] = column[2] = None
+		return entry
+	def remove(self, threshold, entry):
+		""" Remove an entry if still present """
+		if entry[2] is None:
+			return
+		entry[2] = None
+		self.count -= 1
+		self.removed += 1
+		if self.removed > self.count:
+			for column in self.columns.itervalues():
+				column[0] = [entry for entry in column[0] if entry[2] is not None]
+				column[1] = column[2] = None
+			self.removed = 0
+	def crossed(self, array):
+		""" Remove and return the entries whose thresholds the elements of array satisfy """
+		if not self.count:
+			return []
+		numpy = self.numpy
+		crossed = []
+		for op, column in self.columns.iteritems():
+			entries = column[0]
+			if not entries:
+				continue
+			if column[1] is None:
+				# one element index per entry, a row of indices per entry for multi-dimensional arrays
+				column[1] = numpy.array([entry[3] for entry in entries])
+				column[2] = numpy.array([entry[0] for entry in entries])
+			indices = column[1]
+			elements = array[indices] if indices.ndim == 1 else array[tuple(indices.T)]
+			hits = numpy.flatnonzero(Threshold.OPERATORS[op](elements, column[2]))
+			if not len(hits):
+				continue
+			for i in hits:
+				entry = entries[i]
+				if entry[2] is not None:
+					crossed.append(tuple(entry[:3]))
+					# already removed for remove()
+					entry[2] = None
+				else:
+					self.removed -= 1
+			# keep the entries not crossed
+			kept = numpy.ones(len(entries), bool)
+			kept[hits] = False
+			column[0] = list(itertools.compress(entries, kept.tolist()))
+			column[1] = column[1][kept]
+			column[2] = column[2][kept]
+		self.count -= len(crossed)
+		crossed.sort(key=operator.itemgetter(1))
+		return crossed
+
+# ------------------------------------------------------------
+#                        === Timers ===
+# ------------------------------------------------------------
+class Timer(object):
+	""" A timer, calls f(*args) at time t, returned by the timer queues to allow cancellation """
+	__slots__ = ('t', 'seq', 'f', 'args', 'active', 'slot', 'level')
+	order = staticmethod(operator.attrgetter('t', 'seq'))   # sort key of timers
+	def __init__(self, t, seq, f, args):
+		""" Initialize """
+		self.t = t              # time to fire at
+		self.seq = seq          # sequence number, orders timers firing at the same time
+		self.f = f              # function to call
+		self.args = args        # arguments of f
+		self.active = True      # False if fired or cancelled
+		self.slot = None        # set holding this timer, for queues needing it
+		self.level = None       # level of this set in a timing wheel
+	def __repr__(self):
+		""" Debug information on a timer """
+		return 'Timer ' + str(self.seq) + ' at ' + str(self.t) + (' (active)' if self.active else '')
+
+class HeapTimerQueue(object):
+	""" Timers kept in a binary heap, precise but in O(log n) per timer """
+	def __init__(self):
+		""" Initialize """
+		self.heap = []          # list of (t, seq, timer)
+		self.counter = 0        # sequence number of the next timer
+		self.count = 0          # number of active timers
+	def __len__(self):
+		""" Return the number of active timers """
+		return self.count
+	def add(self, t, f, args=()):
+		""" Add a timer calling f(*args) at time t, return it """
+		timer = Timer(t, self.counter, f, args)
+		heapq.heappush(self.heap, (t, self.counter, timer))
+		self.counter += 1
+		self.count += 1
+		return timer
+	def cancel(self, timer):
+		""" Cancel a timer, return whether it was active """
+		if not timer.active:
+			return False
+		timer.active = False
+		self.count -= 1
+		# cancelled timers are left in the heap, rebuild it if they dominate
+		if len(self.heap) > 64 and self.count < len(self.heap) // 2:
+			self.heap = [entry for entry in self.heap if entry[2].active]
+			heapq.heapify(self.heap)
+		return True
+	def next_time(self):
+		""" Return the time of the next timer, None if there is none """
+		heap = self.heap
+		while heap and not heap[0][2].active:
+			heapq.heappop(heap)
+		if heap:
+			return heap[0][0]
+		return None
+	def pop_due(self, now):
+		""" Remove and return the list of timers with a time not later than now, in order """
+		heap = self.heap
+		due = []
+		while heap and heap[0][0] <= now:
+			timer = heapq.heappop(heap)[2]
+			if timer.active:
+				timer.active = False
+				due.append(timer)
+		self.count -= len(due)
+		return due
+
+class WheelTimerQueue(object):
+	""" Timers kept in a hierarchical timing wheel, in O(1) per timer.
+	
+	Time is divided in ticks of resolution seconds, and a timer fires at the
+	first tick not earlier than its time. The first level has one slot per
+	tick, each further level has slots spanning a full turn of the level
+	below, and its timers are moved down when the level below wraps around.
+	Timers beyond the last level are kept aside and re-inserted when the
+	last level wraps around.
+	"""
+	def __init__(self, resolution=0.001, slot_bits=8, levels=4):
+		""" Initialize """
+		self.resolution = resolution
+		self.slot_bits = slot_bits
+		self.slot_mask = (1 << slot_bits) - 1
+		self.levels = [[set() for i in xrange(1 << slot_bits)] for level in xrange(levels)]
+		self.level_counts = [0] * levels   # number of timers per level
+		self.overflow = set()
+		self.expired = set()    # timers added with a tick already processed
+		self.current = None     # last processed tick
+		self.counter = 0        # sequence number of the next timer
+		self.count = 0          # number of active timers
+	def __len__(self):
+		""" Return the number of active timers """
+		return self.count
+	def add(self, t, f, args=()):
+		""" Add a timer calling f(*args) at time t, return it """
+		timer = Timer(t, self.counter, f, args)
+		self.counter += 1
+		self.count += 1
+		if self.current is None:
+			# not aligned by pop_due() yet, assume t is in the future
+			self.current = int(math.floor(t / self.resolution)) - 1
+		self._insert(timer, self.current + 1)
+		return timer
+	def cancel(self, timer):
+		""" Cancel a timer, return whether it was active """
+		if not timer.active:
+			return False
+		timer.active = False
+		self.count -= 1
+		slot = timer.slot
+		if slot is not None:
+			slot.discard(timer)
+			if timer.level is not None:
+				self.level_counts[timer.level] -= 1
+			timer.slot = None
+		return True
+	def next_time(self):
+		""" Return the time of the tick at which the next timer fires, None if there is none.
+		
+		The time is rounded up to the tick, so it can be up to resolution later
+		than the time of the timer. For timers in upper levels, it is the first
+		tick of their slot, which can be earlier.
+		"""
+		if not self.count:
+			return None
+		if self.expired:
+			return min(timer.t for timer in self.expired)
+		next_tick = self.current + 1
+		first_tick = None
+		shift = 0
+		for level, slots in enumerate(self.levels):
+			if self.level_counts[level]:
+				# the slot of the current span is moved down when the span starts,
+				# after that it holds timers a full turn later
+				block = next_tick >> shift
+				first = 1 if next_tick & ((1 << shift) - 1) else 0
+				for offset in xrange(first, first + len(slots)):
+					if slots[(block + offset) & self.slot_mask]:
+						tick = max((block + offset) << shift, next_tick)
+						if first_tick is None or tick < first_tick:
+							first_tick = tick
+						break
+			shift += self.slot_bits
+		if self.overflow:
+			# rounded as in _insert(), so that pop_due() at this time reaches their tick
+			overflow_tick = int(math.ceil(min(timer.t for timer in self.overflow) / self.resolution - 1e-6))
+			if first_tick is None or overflow_tick < first_tick:
+				first_tick = overflow_tick
+		return first_tick * self.resolution
+	def pop_due(self, now):
+		""" Remove and return the list of timers due at time now, in order """
+		due = []
+		# same tolerance as in _insert(), so that the time returned by next_time() is enough
+		target = int(math.floor(now / self.resolution + 1e-6))
+		if self.current is None:
+			# first call, align on now
+			self.current = target
+			return due
+		if self.expired:
+			for timer in self.expired:
+				timer.slot = None
+				timer.active = False
+			due.extend(self.expired)
+			self.expired.clear()
+		slot_bits = self.slot_bits
+		slot_mask = self.slot_mask
+		levels = self.levels
+		level_counts = self.level_counts
+		while self.current < target and self.count:
+			if not level_counts[0]:
+				# nothing in first level, jump to the end of its current turn
+				boundary = ((self.current >> slot_bits) + 1) << slot_bits
+				if boundary > target:
 					break
-			# look into parents
-			for parent_cls in cls.__bases__:
-				self._set_name(parent_cls,False)
-			# if not found and top-level, assert
-			if top_level:
-				assert self.myname is not None
+				self.current = boundary - 1
+			tick = self.current + 1
+			# move timers down from levels whose span starts at this tick
+			level = 1
+			shift = slot_bits
+			while not (tick >> (shift - slot_bits)) & slot_mask:
+				if level == len(levels):
+					self._cascade(self.overflow, None, tick)
+					break
+				self._cascade(levels[level][(tick >> shift) & slot_mask], level, tick)
+				level += 1
+				shift += slot_bits
+			# timers of this tick
+			slot = levels[0][tick & slot_mask]
+			if slot:
+				level_counts[0] -= len(slot)
+				for timer in slot:
+					timer.slot = None
+					timer.active = False
+					due.append(timer)
+				slot.clear()
+			self.current = tick
+		if self.current < target:
+			self.current = target
+		self.count -= len(due)
+		due.sort(key=Timer.order)
+		return due
+	def _cascade(self, slot, level, tick):
+		""" Re-insert the timers of a slot relative to tick """
+		if not slot:
+			return
+		timers = list(slot)
+		slot.clear()
+		if level is not None:
+			self.level_counts[level] -= len(timers)
+		for timer in timers:
+			self._insert(timer, tick)
+	def _insert(self, timer, base):
+		""" Insert timer in a slot given its distance from tick base """
+		# tolerate rounding errors, so that timers at a multiple of the resolution are not delayed by a tick
+		expires = int(math.ceil(timer.t / self.resolution - 1e-6))
+		delta = expires - base
+		level = None
+		if delta < 0:
+			slot = self.expired
+		elif delta <= self.slot_mask:
+			# most timers are in the first level
+			level = 0
+			slot = self.levels[0][expires & self.slot_mask]
+		else:
+			shift = self.slot_bits
+			for level in xrange(1, len(self.levels)):
+				if delta >> (shift + self.slot_bits) == 0:
+					slot = self.levels[level][(expires >> shift) & self.slot_mask]
+					break
+				shift += self.slot_bits
+			else:
+				slot = self.overflow
+				level = None
+		if level is not None:
+			self.level_counts[level] += 1
+		slot.add(timer)
+		timer.slot = slot
+		timer.level = level
+
+# ------------------------------------------------------------
+#                     === Ready queues ===
+# ------------------------------------------------------------
+class PriorityReadyQueue(object):
+	""" Ready tasks in one queue per priority level, higher priorities first.
+	
+	Within a level, tasks with a deadline run first, earliest absolute
+	deadline first, their absolute deadline being set when they are queued
+	by adding their relative deadline to clock(). Other tasks are in FIFO
+	order, in O(1) per operation for a fixed set of levels. This has the
+	interface of the deque of tasks it replaces in the scheduler.
+	"""
+	def __init__(self, clock, tasks=()):
+		""" Initialize """
+		self.clock = clock
+		self.levels = {}        # map of: priority => [priority, deque of tasks, heap of (deadline, seq, task)]
+		self.order = []         # levels by decreasing priority
+		self.counter = 0        # sequence number of the next task with a deadline
+		self.count = 0          # number of entries
+		for task in tasks:
+			self.append(task)
+	def __len__(self):
+		""" Return the number of entries """
+		return self.count
+	def __iter__(self):
+		""" Iterate over the entries, in the order they will be popped """
+		for priority, fifo, heap in self.order:
+			for entry in sorted(heap):
+				yield entry[2]
+			for task in fifo:
+				yield task
+	def __repr__(self):
+		""" Debug information on the queue """
+		return 'PriorityReadyQueue(' + str(list(self)) + ')'
+	def append(self, task):
+		""" Add a task at the end of its level """
+		if task.deadline is None:
+			self._level(task.priority)[1].append(task)
+		else:
+			self._push_deadline(task)
+		self.count += 1
+	def appendleft(self, task):
+		""" Add a task at the start of its level """
+		if task.deadline is None:
+			self._level(task.priority)[1].appendleft(task)
+		else:
+			self._push_deadline(task)
+		self.count += 1
+	def popleft(self):
+		""" Remove and return the next task """
+		for priority, fifo, heap in self.order:
+			if heap:
+				self.count -= 1
+				return heapq.heappop(heap)[2]
+			if fifo:
+				self.count -= 1
+				return fifo.popleft()
+		raise IndexError('pop from an empty ready queue')
+	def _push_deadline(self, task):
+		""" Add a task ordered by its absolute deadline """
+		heapq.heappush(self._level(task.priority)[2], (self.clock() + task.deadline, self.counter, task))
+		self.counter += 1
+	def _level(self, priority):
+		""" Return the level of priority, creating it if needed """
+		level = self.levels.get(priority)
+		if level is None:
+			level = [priority, deque(), []]
+			self.levels[priority] = level
+			self.order.append(level)
+			self.order.sort(key=operator.itemgetter(0), reverse=True)
+		return level
+
+# ------------------------------------------------------------
+#                       === Logging ===
+# ------------------------------------------------------------
+class LogSink(object):
+	""" Parent of all log sinks, receiving the events of a scheduler at or above a level """
+	DEBUG = 10
+	INFO = 20
+	WARNING = 30
+	ERROR = 40
+	def __init__(self, level=INFO):
+		""" Initialize """
+		self.level = level
+	def emit(self, level, t, fmt, args):
+		""" Receive an event at wall-clock time t, its message is fmt % args """
+		raise NotImplementedError('log sink superclass should not be used directly')
+	@staticmethod
+	def format(level, t, fmt, args):
+		""" Return the text of an event """
+		return time.ctime(t) + ' - ' + fmt % args
+
+class StreamLogSink(LogSink):
+	""" Write events to a stream, by default stdout, optionally from a background thread """
+	def __init__(self, stream=None, level=LogSink.INFO, threaded=False):
+		""" Initialize """
+		super(StreamLogSink, self).__init__(level)
+		self.stream = stream
+		self.queue = None
+		if threaded:
+			self.queue = Queue.Queue()
+			thread = threading.Thread(target=self._write_events)
+			thread.daemon = True
+			thread.start()
+	def emit(self, level, t, fmt, args):
+		""" Write the event, or queue it if threaded """
+		if self.queue is not None:
+			self.queue.put((level, t, fmt, args))
+		else:
+			self._write(level, t, fmt, args)
+	def flush(self):
+		""" Wait until all queued events are written """
+		if self.queue is not None:
+			self.queue.join()
+	def _write(self, level, t, fmt, args):
+		# look up stdout when writing, as it might be redirected
+		stream = self.stream if self.stream is not None else sys.stdout
+		stream.write(self.format(level, t, fmt, args) + '\n')
+	def _write_events(self):
+		while True:
+			event = self.queue.get()
+			try:
+				self._write(*event)
+			finally:
+				self.queue.task_done()
+
+class RingBufferLogSink(LogSink):
+	""" Keep the last events in memory, formatting them only when read """
+	def __init__(self, capacity=1024, level=LogSink.DEBUG):
+		""" Initialize """
+		super(RingBufferLogSink, self).__init__(level)
+		self.events = deque(maxlen=capacity)
+	def emit(self, level, t, fmt, args):
+		""" Keep the event """
+		self.events.append((level, t, fmt, args))
+	def messages(self):
+		""" Return the list of the texts of the events kept """
+		return [self.format(*event) for event in self.events]
+
+# ------------------------------------------------------------
+#                       === Profiling ===
+# ------------------------------------------------------------
+class TaskProfile(object):
+	""" Statistics on the slices of execution of a task """
+	__slots__ = ('name', 'resumes', 'wall_time', 'max_wall_time', 'cpu_time', 'max_cpu_time')
+	def __init__(self, name):
+		""" Initialize """
+		self.name = name
+		self.resumes = 0            # number of slices
+		self.wall_time = 0.         # cumulative wall-clock time of slices
+		self.max_wall_time = 0.     # longest wall-clock time of a slice
+		self.cpu_time = 0.          # cumulative processor time of slices
+		self.max_cpu_time = 0.      # longest processor time of a slice
+	def as_dict(self):
+		""" Return the statistics as a dict """
+		return dict((name, getattr(self, name)) for name in TaskProfile.__slots__)
+
+class Profiler(object):
+	""" Statistics on the execution of a scheduler, enabled by setting Scheduler.profiler.
+	
+	If trace_capacity is not 0, the last slices are kept to be exported as a
+	trace in the Chrome trace event format, readable by chrome://tracing.
+	"""
+	def __init__(self, trace_capacity=0):
+		""" Initialize """
+		self.start_time = time.time()
+		self.tasks = {}                 # map of: tid => TaskProfile
+		self.syscalls = {}              # map of: name of system call => count, None if yielding nothing, 'exit' if terminating
+		self.slices = 0
+		self.ready_length_total = 0     # sum of the lengths of the ready queue at each slice
+		self.max_ready_length = 0
+		self.timers = 0                 # number of timers fired
+		self.timer_lag_total = 0.       # sum of the delays between the time of timers and their firing
+		self.max_timer_lag = 0.
+		self.condition_evaluations = 0
+		self.trace = deque(maxlen=trace_capacity) if trace_capacity else None
+	def run(self, task, ready_length):
+		""" Run a slice of task, recording its statistics """
+		start_wall_time = time.time()
+		start_cpu_time = time.clock()
+		try:
+			result = task.run()
+		except StopIteration:
+			self._record(task, 'exit', start_wall_time, start_cpu_time, ready_length)
+			raise
+		syscall = type(result).__name__ if isinstance(result, SystemCall) else None
+		self._record(task, syscall, start_wall_time, start_cpu_time, ready_length)
+		return result
+	def _record(self, task, syscall, start_wall_time, start_cpu_time, ready_length):
+		""" Record the statistics of a slice """
+		wall_time = time.time() - start_wall_time
+		cpu_time = time.clock() - start_cpu_time
+		profile = self.tasks.get(task.tid)
+		if profile is None:
+			profile = self.tasks[task.tid] = TaskProfile(task.name)
+		profile.resumes += 1
+		profile.wall_time += wall_time
+		profile.cpu_time += cpu_time
+		if wall_time > profile.max_wall_time:
+			profile.max_wall_time = wall_time
+		if cpu_time > profile.max_cpu_time:
+			profile.max_cpu_time = cpu_time
+		self.syscalls[syscall] = self.syscalls.get(syscall, 0) + 1
+		self.slices += 1
+		self.ready_length_total += ready_length
+		if ready_length > self.max_ready_length:
+			self.max_ready_length = ready_length
+		if self.trace is not None:
+			self.trace.append((task.tid, profile.name, syscall, start_wall_time, wall_time, ready_length))
+	def timer_lag(self, lag):
+		""" Record the delay between the time of a timer and its firing """
+		self.timers += 1
+		self.timer_lag_total += lag
+		if lag > self.max_timer_lag:
+			self.max_timer_lag = lag
+	def snapshot(self):
+		""" Return the statistics as a dict """
+		return {
+			'duration': time.time() - self.start_time,
+			'tasks': dict((tid, profile.as_dict()) for tid, profile in self.tasks.iteritems()),
+			'syscalls': dict(self.syscalls),
+			'slices': self.slices,
+			'mean_ready_length': float(self.ready_length_total) / self.slices if self.slices else 0.,
+			'max_ready_length': self.max_ready_length,
+			'timers': self.timers,
+			'mean_timer_lag': self.timer_lag_total / self.timers if self.timers else 0.,
+			'max_timer_lag': self.max_timer_lag,
+			'condition_evaluations': self.condition_evaluations
+		}
+	def chrome_trace(self):
+		""" Return the slices kept as a trace in the Chrome trace event format """
+		events = []
+		for tid, name, syscall, start_time, duration, ready_length in self.trace or ():
+			timestamp = (start_time - self.start_time) * 1e6
+			events.append({ 'name': name, 'cat': str(syscall), 'ph': 'X', 'pid': 0, 'tid': tid, 'ts': timestamp, 'dur': duration * 1e6 })
+			events.append({ 'name': 'ready queue', 'ph': 'C', 'pid': 0, 'ts': timestamp, 'args': { 'length': ready_length } })
+		return { 'traceEvents': events }
+	def export_chrome_trace(self, filename):
+		""" Write the trace to a file, in the Chrome trace event format """
+		with open(filename, 'w') as f:
+			json.dump(self.chrome_trace(), f)
+
+# ------------------------------------------------------------
+#                       === Recording ===
+# ------------------------------------------------------------
+class EventRecorder(object):
+	""" Record the events of a scheduler to a binary file, enabled by setting Scheduler.recorder.
+	
+	The file starts with a header, followed by records of a length, a kind,
+	a time and a body. Records are buffered and written by a background
+	thread, in chunks handed to it by the first step after chunk_records
+	records, call close() at the end of the run. The file is read back by
+	EventLog.
+	"""
+	HEADER = struct.Struct('<4sH')
+	MAGIC = 'TEEL'
+	VERSION = 2
+	# length of the body, kind, time
+	RECORD = struct.Struct('<IBd')
+	# kinds of records
+	NAME, STEP, SET, CREATED, EXITED, TIMER = range(6)
+	# bodies of records, followed by a string for NAME, SET and CREATED
+	NAME_BODY = struct.Struct('<H')         # identifier of the name
+	SET_BODY = struct.Struct('<HIB')        # identifier of the name, tid or 0 if set from outside tasks, encoding of the value
+	TASK_BODY = struct.Struct('<I')         # tid
+	TIMER_BODY = struct.Struct('<d')        # time the timer was due
+	FLOAT_VALUE = struct.Struct('<d')       # value of a SET record with the FLOAT encoding
+	# whole records, or their start for the ones followed by a string, to pack them at once
+	NAME_RECORD = struct.Struct('<IBdH')
+	SET_RECORD = struct.Struct('<IBdHIB')
+	SET_FLOAT_RECORD = struct.Struct('<IBdHIBd')
+	TASK_RECORD = struct.Struct('<IBdI')
+	TIMER_RECORD = struct.Struct('<IBdd')
+	# encodings of the values of condition variables, floats being the most common
+	MARSHAL, PICKLE, FLOAT = range(3)
+	def __init__(self, filename, chunk_records=4096):
+		""" Initialize """
+		self.file = open(filename, 'wb')
+		self.file.write(EventRecorder.HEADER.pack(EventRecorder.MAGIC, EventRecorder.VERSION))
+		self.chunk_records = chunk_records
+		self.buffer = []
+		self.name_ids = {}      # map of: name => identifier
+		# bound once with their lengths and kinds, as recording must be cheap
+		self.pack_step = functools.partial(EventRecorder.RECORD.pack, 0, EventRecorder.STEP)
+		self.pack_set_float = functools.partial(EventRecorder.SET_FLOAT_RECORD.pack,
+			EventRecorder.SET_BODY.size + EventRecorder.FLOAT_VALUE.size, EventRecorder.SET)
+		self.pack_timer = functools.partial(EventRecorder.TIMER_RECORD.pack, EventRecorder.TIMER_BODY.size, EventRecorder.TIMER)
+		# exc_info of an error of the writing thread, raised by flush() and close()
+		self.error = None
+		self.queue = Queue.Queue()
+		self.thread = threading.Thread(target=self._write_chunks)
+		self.thread.daemon = True
+		self.thread.start()
+	def step(self, t):
+		""" Record the start of a step at time t """
+		buffer = self.buffer
+		buffer.append(self.pack_step(t))
+		if len(buffer) >= self.chunk_records:
+			self._write_buffer()
+	def condition_set(self, t, name, task, value):
+		""" Record that condition variable name was set to value at time t by task, None if from outside tasks """
+		name_id = self.name_ids.get(name)
+		if name_id is None:
+			name_id = self._add_name(t, name)
+		tid = task.tid if task is not None else 0
+		buffer = self.buffer
+		if type(value) is float:
+			buffer.append(self.pack_set_float(t, name_id, tid, EventRecorder.FLOAT, value))
+		else:
+			try:
+				data = marshal.dumps(value, 2)
+				encoding = EventRecorder.MARSHAL
+			except ValueError:
+				data = cPickle.dumps(value, 2)
+				encoding = EventRecorder.PICKLE
+			buffer.append(EventRecorder.SET_RECORD.pack(EventRecorder.SET_BODY.size + len(data), EventRecorder.SET, t, name_id, tid, encoding) + data)
+	def task_created(self, t, tid, name):
+		""" Record the creation of task tid at time t """
+		self.buffer.append(EventRecorder.TASK_RECORD.pack(EventRecorder.TASK_BODY.size + len(name), EventRecorder.CREATED, t, tid) + name)
+	def task_exited(self, t, tid):
+		""" Record the termination of task tid at time t """
+		self.buffer.append(EventRecorder.TASK_RECORD.pack(EventRecorder.TASK_BODY.size, EventRecorder.EXITED, t, tid))
+	def timer_fired(self, t, due_time):
+		""" Record that a timer due at due_time fired at time t """
+		self.buffer.append(self.pack_timer(t, due_time))
+	def flush(self):
+		""" Wait until all records are written, raise the error of the writing thread if any """
+		self._write_buffer()
+		self.queue.join()
+		error = self.error
+		if error is not None:
+			raise error[0], error[1], error[2]
+		self.file.flush()
+	def close(self):
+		""" Write all records and close the file, raise the error of the writing thread if any """
+		try:
+			self.flush()
+		finally:
+			self.queue.put(None)
+			self.thread.join()
+			self.file.close()
+	def _write_buffer(self):
+		if self.buffer:
+			self.queue.put(''.join(self.buffer))
+			self.buffer = []
+	def _add_name(self, t, name):
+		name_id = self.name_ids[name] = len(self.name_ids)
+		self.buffer.append(EventRecorder.NAME_RECORD.pack(EventRecorder.NAME_BODY.size + len(name), EventRecorder.NAME, t, name_id) + name)
+		return name_id
+	def _write_chunks(self):
+		while True:
+			chunk = self.queue.get()
+			try:
+				if chunk is None:
+					return
+				# after an error, the file is incomplete, drop the chunks
+				if self.error is None:
+					self.file.write(chunk)
+			except Exception:
+				self.error = sys.exc_info()
+			finally:
+				self.queue.task_done()
+
+class EventLog(object):
+	""" The events recorded by an EventRecorder, read through a memory map.
+	
+	Events are tuples of a kind, a time and the fields of the kind:
+	('step', t), ('set', t, name, tid, value), ('created', t, tid, name),
+	('exited', t, tid) and ('timer', t, due_time), tid being None for
+	condition variables set from outside tasks.
+	"""
+	KINDS = { EventRecorder.STEP: 'step', EventRecorder.SET: 'set', EventRecorder.CREATED: 'created',
+		EventRecorder.EXITED: 'exited', EventRecorder.TIMER: 'timer' }
+	def __init__(self, filename):
+		""" Initialize """
+		with open(filename, 'rb') as f:
+			self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		header = EventRecorder.HEADER
+		magic, version = header.unpack_from(self.data, 0)
+		if magic != EventRecorder.MAGIC or version != EventRecorder.VERSION:
+			raise ValueError('not an event log of version %d' % EventRecorder.VERSION)
+		self.start = header.size
+		# time of the first record, to start the clock of a replay
+		self.start_time = None
+		if len(self.data) >= self.start + EventRecorder.RECORD.size:
+			self.start_time = EventRecorder.RECORD.unpack_from(self.data, self.start)[2]
+	def __iter__(self):
+		""" Iterate over the events """
+		data = self.data
+		size = len(data)
+		record = EventRecorder.RECORD
+		offset = self.start
+		names = {}
+		while offset + record.size <= size:
+			length, kind, t = record.unpack_from(data, offset)
+			offset += record.size
+			end = offset + length
+			if end > size:
+				# truncated by a crash
+				return
+			if kind == EventRecorder.NAME:
+				names[EventRecorder.NAME_BODY.unpack_from(data, offset)[0]] = data[offset + EventRecorder.NAME_BODY.size:end]
+			elif kind == EventRecorder.STEP:
+				yield ('step', t)
+			elif kind == EventRecorder.SET:
+				name_id, tid, encoding = EventRecorder.SET_BODY.unpack_from(data, offset)
+				value = data[offset + EventRecorder.SET_BODY.size:end]
+				if encoding == EventRecorder.FLOAT:
+					value = EventRecorder.FLOAT_VALUE.unpack(value)[0]
+				elif encoding == EventRecorder.MARSHAL:
+					value = marshal.loads(value)
+				else:
+					value = cPickle.loads(value)
+				yield ('set', t, names[name_id], tid or None, value)
+			elif kind == EventRecorder.CREATED:
+				yield ('created', t, EventRecorder.TASK_BODY.unpack_from(data, offset)[0], data[offset + EventRecorder.TASK_BODY.size:end])
+			elif kind == EventRecorder.EXITED:
+				yield ('exited', t, EventRecorder.TASK_BODY.unpack_from(data, offset)[0])
+			elif kind == EventRecorder.TIMER:
+				yield ('timer', t, EventRecorder.TIMER_BODY.unpack_from(data, offset)[0])
+			offset = end
+	def close(self):
+		""" Release the memory map """
+		self.data.close()
+	def replay(self, sched):
+		""" Replay the run on SimulatedTimeScheduler sched, return the number of events replayed.
+		
+		The tasks of the run must have been created in sched, in the same
+		order. The clock of sched follows the recorded times, timers fire and
+		steps run when they did, and condition variables set from outside
+		tasks are set again, so tasks see the same values at the same times.
+		"""
+		if sched.current_task is not None:
+			raise RuntimeError('EventLog.replay() called within a task.')
+		count = 0
+		# timers due, fired one per recorded timer, as steps might have run in between
+		due = deque()
+		for event in self:
+			kind, t = event[0], event[1]
+			if t > sched.now:
+				sched.now = t
+			if kind == 'step':
+				sched.step()
+			elif kind == 'timer':
+				if not due:
+					due.extend(sched.timer_cb.pop_due(sched.now))
+				if due:
+					sched._fire_timer(due.popleft(), sched.now)
+			elif kind == 'set' and event[3] is None:
+				setattr(sched, event[2], event[4])
+			else:
+				continue
+			count += 1
+		return count
 
 # ------------------------------------------------------------
 #                      === Scheduler ===
 # ------------------------------------------------------------
+class WakeupPipe(object):
+	""" Sleep for a duration or until woken up by another thread, used by schedulers and fleets.
+	
+	The pipe is created by the first sleep() or wake_up() and released by
+	close(). Where poll() or fcntl are missing, such as on Windows, there
+	is no pipe and sleeping is a plain time.sleep().
+	"""
+	# Period in seconds at which a sleep with no end checks for work when there is no pipe
+	PLAIN_SLEEP_PERIOD = 0.01
+	def __init__(self):
+		""" Initialize """
+		self.fds = None
+		self.poller = None
+		self.lock = threading.Lock()
+	
+	def sleep(self, duration):
+		""" Sleep a certain amount of time, forever if None, or until woken up """
+		fds = self.fds
+		if fds is None:
+			fds = self.open()
+			if fds is None:
+				time.sleep(self.PLAIN_SLEEP_PERIOD if duration is None else duration)
+				return
+		poller = self.poller
+		if duration is None:
+			woken = poller.poll()
+		else:
+			# poll counts in milliseconds, sleep the rest to keep timers precise
+			end_time = time.time() + duration
+			woken = poller.poll(int(duration * 1000))
+			if not woken:
+				remaining = end_time - time.time()
+				if remaining > 0:
+					time.sleep(remaining)
+		if woken:
+			# empty the pipe
+			try:
+				while os.read(fds[0], 4096):
+					pass
+			except OSError as e:
+				if e.errno != errno.EAGAIN:
+					raise
+	
+	def wake_up(self):
+		""" Wake sleep() up, can be called from any thread """
+		fds = self.fds
+		if fds is None:
+			# the sleeper might be about to create the pipe, write to it first
+			fds = self.open()
+			if fds is None:
+				return
+		try:
+			os.write(fds[1], b'\0')
+		except OSError as e:
+			# if the pipe is full, the sleeper will wake up anyway
+			if e.errno != errno.EAGAIN:
+				raise
+	
+	def close(self):
+		""" Release the pipe, it is created again if needed """
+		with self.lock:
+			if self.fds is not None:
+				for fd in self.fds:
+					os.close(fd)
+				self.fds = None
+				self.poller = None
+	
+	def open(self):
+		""" Create the pipe if it does not exist yet, return its file descriptors, None if not supported """
+		try:
+			import fcntl
+			poll = select.poll
+		except (ImportError, AttributeError):
+			return None
+		with self.lock:
+			if self.fds is None:
+				fds = os.pipe()
+				for fd in fds:
+					fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+				poller = poll()
+				poller.register(fds[0], select.POLLIN)
+				self.poller = poller
+				self.fds = fds
+			return self.fds
+
+class SchedulerMeta(type):
+	""" Metaclass of schedulers, binds the names of their condition variables """
+	def __init__(cls, name, bases, members):
+		super(SchedulerMeta, cls).__init__(name, bases, members)
+		cv_names = set()
+		for klass in cls.__mro__:
+			for member_name, value in klass.__dict__.iteritems():
+				if isinstance(value, ConditionVariable):
+					if value.myname is None:
+						value.myname = member_name
+					cv_names.add(member_name)
+		# The names of all condition variables of this scheduler class
+		cls._cv_names = frozenset(cv_names)
+
 class Scheduler(object):
 	""" The scheduler base object, do not instanciate directly """
+	__metaclass__ = SchedulerMeta
+	# Format of snapshots: header with magic, version and number of tasks, followed by the state in marshal format
+	SNAPSHOT_HEADER = struct.Struct('<4sHI')
+	SNAPSHOT_MAGIC = 'TEER'
+	SNAPSHOT_VERSION = 1
+	# Maximum number of terminated tasks kept for reuse
+	TASK_FREELIST_SIZE = 256
 	def __init__(self):
 		""" Initialize """
 		# Map of all task identifiers to tasks
 		self.taskmap = {}
-		# Deque of ready tasks
-		self.ready   = deque()   
-		# Tasks waiting for other tasks to exit, map of: tid => list of tasks
+		# Terminated tasks to be reused by new tasks, none of the scheduler structures refer to them
+		self.task_freelist = []
+		# Deque of ready tasks, entries of tasks not in state READY are skipped,
+		# replaced by a PriorityReadyQueue when a task has a priority or a deadline
+		self.ready   = deque()
+		# Tasks waiting for other tasks to exit, map of: tid => set of tasks
 		self.exit_waiting = {}
+		# Reverse of exit_waiting, map of: task => set of tids it still waits for
+		self.exit_waited = {}
 		# Task waiting on conditions, map of: "name of condition variable" => (condition, task)
 		self.cond_waiting = {}
-		# Task being paused by another task
-		self.paused_in_syscall = set()
-		self.paused_in_ready = set()
+		# Thresholds of the predicates tasks wait on, map of: "name of condition variable" => ThresholdIndex
+		self.threshold_indexes = {}
 		# Not running a task initially
 		self.current_task = None
+		# Where events are logged, None to disable logging
+		self.log_sink = StreamLogSink()
+		# Statistics on the execution, None to disable them
+		self.profiler = None
+		# EventRecorder of the run, None to disable recording
+		self.recorder = None
+		# Duration in seconds above which a slice of a task is reported as an overrun, None to disable
+		self.overrun_duration = None
+		# Batch of condition variable updates being collected, None if updates are immediate
+		self.batch = None
+		# Deque of (function, args) called from other threads, to be run by the scheduler
+		self.inbox = deque()
+		# Wakes _sleep() up from other threads, released by close()
+		self.wakeup_pipe = WakeupPipe()
+		# Executor of RunInPool, a process pool with one process per core is created when first used
+		self.process_pool = None
+		# Executor of RunInThread, a pool of thread_pool_workers threads is created when first used
+		self.thread_pool = None
+		self.thread_pool_workers = 4
+		# Number of futures completed by other threads that tasks wait for
+		self.pending_futures = 0
 	
 	# Public API, these functions are safe to be called from within a task or from outside
 	
@@ -124,19 +1425,39 @@ class Scheduler(object):
 		else:
 			return None
 	
-	def new_task(self, target):
-		""" Create a new task from function target, return the task identifier """
-		newtask = Task(target)
+	def new_task(self, target, priority=0, deadline=None, group=None):
+		""" Create a new task from function target or a RestartableTask, return the task identifier.
+		
+		Ready tasks of higher priority run first. Among tasks of the same
+		priority, the ones with a deadline run first, earliest deadline first,
+		a task being due deadline seconds after it becomes ready. The task is
+		in TaskGroup group, if given.
+		"""
+		newtask = self._create_task(target)
+		if group is not None:
+			newtask.group = group
+			group._attach()
+			group.tids.add(newtask.tid)
+			group.created += 1
+		if priority != 0 or deadline is not None:
+			newtask.priority = priority
+			newtask.deadline = deadline
+			if not isinstance(self.ready, PriorityReadyQueue):
+				self.ready = PriorityReadyQueue(self.current_time, self.ready)
 		self.taskmap[newtask.tid] = newtask
 		self._schedule(newtask)
 		self._log_task_created(newtask)
+		if self.recorder is not None:
+			self.recorder.task_created(self.current_time(), newtask.tid, newtask.name)
 		return newtask.tid
 	
 	def kill_task(self, tid):
 		""" Kill a task, return whether the task was killed """
 		task = self.taskmap.get(tid,None)
 		if task:
-			task.target.close() 
+			task.target.close()
+			self._cancel_waits(task)
+			self._exit(task)
 			return True
 		else:
 			return False
@@ -147,55 +1468,92 @@ class Scheduler(object):
 	
 	def kill_all_tasks_except(self, tids):
 		""" Kill all tasks except a subset, return the list of killed tasks """
-		to_kill = filter(lambda tid: tid not in tids, self.list_all_tids())
-		return self.kill_tasks(to_kill)
+		excluded = set(tids)
+		return self.kill_tasks([tid for tid in self.taskmap if tid not in excluded])
 
 	def pause_task(self, tid):
 		""" Pause a task, return whether the task was paused """
-		task = self.taskmap.get(tid,None)
-		if task is None \
-			or task is self.current_task\
-			or task in self.paused_in_ready\
-			or task in self.paused_in_syscall:
-			return False
-		if task in self.ready:
-			self.ready.remove(task)
-			self.paused_in_ready.add(task)
-		else:
-			self.paused_in_syscall.add(task)
-		return True
+		return len(self.pause_tasks((tid,))) == 1
 	
 	def pause_tasks(self, tids):
 		""" Pause multiple tasks, return the lits of paused tasks """
-		return filter(self.pause_task, tids)
+		paused = []
+		for tid in tids:
+			task = self.taskmap.get(tid,None)
+			if task is None or task is self.current_task:
+				continue
+			state = Task.PAUSE.get(task.state)
+			if state is not None:
+				# if ready, the entry in the ready queue is skipped until resumed
+				task.state = state
+				paused.append(tid)
+		return paused
 	
 	def pause_all_tasks_except(self, tids):
 		""" Pause all tasks except a subset, return the list of paused tasks """
-		to_pause = filter(lambda tid: tid not in tids, self.list_all_tids())
-		return self.pause_tasks(to_pause)
+		excluded = set(tids)
+		return self.pause_tasks([tid for tid in self.taskmap if tid not in excluded])
 	
 	def resume_task(self, tid):
 		""" Resume a task, return whether the task was resumed successfully """
-		task = self.taskmap.get(tid,None)
-		if task is None or task is self.current_task:
-			return False
-		if task in self.paused_in_ready:
-			self.paused_in_ready.remove(task)
-			self.ready.append(task)
-			return True
-		elif task in self.paused_in_syscall:
-			self.paused_in_syscall.remove(task)
-			return True
-		return False
+		return len(self.resume_tasks((tid,))) == 1
 	
 	def resume_tasks(self, tids):
 		""" Resume the execution of multiple tasks, return the list of resumed tasks """
-		return filter(self.resume_task, tids)
+		resumed = []
+		for tid in tids:
+			task = self.taskmap.get(tid,None)
+			if task is None or task is self.current_task:
+				continue
+			state = Task.RESUME.get(task.state)
+			if state is not None:
+				task.state = state
+				# if its entry is still in the ready queue, the task keeps its place
+				if state == Task.READY and not task.queued:
+					task.queued = True
+					self.ready.append(task)
+				resumed.append(tid)
+		return resumed
 	
 	def resume_all_tasks_except(self, tids):
 		""" Resume all tasks except a subset, return the list of resumed tasks """
-		to_resume = filter(lambda tid: tid not in tids, self.list_all_tids())
-		return self.resume_tasks(to_resume)
+		excluded = set(tids)
+		return self.resume_tasks([tid for tid in self.taskmap if tid not in excluded])
+	
+	def new_group(self, name, parent=None):
+		""" Create a TaskGroup to pass to new_task(), within group parent if given """
+		return TaskGroup(name, parent)
+	
+	def pause_group(self, group):
+		""" Pause the tasks of a group and of the groups within it, in O(1), return whether the group was paused """
+		if group.paused:
+			return False
+		group.paused = True
+		return True
+	
+	def resume_group(self, group):
+		""" Resume a paused group, in the number of its tasks that became ready, return whether the group was resumed """
+		if not group.paused:
+			return False
+		group.paused = False
+		# their entries in the ready queue were parked, tasks of groups still paused are parked again
+		parked = group.parked
+		group.parked = deque()
+		for task in parked:
+			self.ready.append(task)
+		return True
+	
+	def kill_group(self, group):
+		""" Kill the tasks of a group and of the groups within it, return the list of killed tasks """
+		return self.kill_tasks(group.all_tids())
+	
+	def new_channel(self, capacity=1):
+		""" Create a Channel holding up to capacity messages, for Send and Recv """
+		return Channel(self, capacity)
+	
+	def new_ring_buffer_channel(self, slots, slot_size):
+		""" Create a RingBufferChannel of slots slots of slot_size bytes, for Reserve, Send and Recv """
+		return RingBufferChannel(self, slots, slot_size)
 	
 	def create_rate(self, rate):
 		""" Create a rate object, to have a loop at a certain frequency """
@@ -203,34 +1561,236 @@ class Scheduler(object):
 		initial_time = self.current_time()
 		return Rate(duration, initial_time)
 	
+	def batch_update(self):
+		""" Return a context in which condition variable updates are collected, conditions are evaluated once when leaving it """
+		if self.batch is not None:
+			return self.batch
+		return BatchUpdate(self)
+	
+	def set_many(self, values):
+		""" Set multiple condition variables from a dict of name => value, return the number of condition evaluations saved.
+		
+		Within another batch, conditions are only evaluated when the outermost
+		batch ends, so None is returned and the saved count of the outermost
+		batch includes these updates.
+		"""
+		with self.batch_update() as batch:
+			for name, value in values.iteritems():
+				if name not in self._cv_names:
+					raise AttributeError("'%s' is not a condition variable" % name)
+				setattr(self, name, value)
+		if batch.depth > 0:
+			return None
+		return batch.saved
+	
+	def call_soon_threadsafe(self, f, *args):
+		""" Call f(*args) from the scheduler as soon as possible, can be called from any thread """
+		self.inbox.append((f, args))
+		self._wakeup()
+	
+	def set_threadsafe(self, name, value):
+		""" Set condition variable name from the scheduler as soon as possible, can be called from any thread """
+		if name not in self._cv_names:
+			raise AttributeError("'%s' is not a condition variable" % name)
+		self.call_soon_threadsafe(setattr, self, name, value)
+	
+	def shutdown_pools(self, wait=True):
+		""" Shut the executors of RunInPool and RunInThread down, waiting for their pending work if wait is true """
+		if self.process_pool is not None:
+			self.process_pool.shutdown(wait)
+			self.process_pool = None
+		if self.thread_pool is not None:
+			self.thread_pool.shutdown(wait)
+			self.thread_pool = None
+	
+	def close(self):
+		""" Release the pipe used to wake the scheduler up from other threads, it is created again if needed """
+		self.wakeup_pipe.close()
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+	
 	def printd(self, msg):
-		""" Print something including the current task identifier """
-		print "[teer tid: " + str(self.get_current_tid()) + "] " + msg
+		""" Log something including the current task identifier """
+		sink = self.log_sink
+		if sink is not None and sink.level <= LogSink.INFO:
+			sink.emit(LogSink.INFO, time.time(), '[teer tid: %s] %s', (self.get_current_tid(), msg))
 	
 	# Public API, these funtions must be called outside a task
 	
-	def step(self):
-		""" Run all tasks until none is ready """
+	def snapshot(self):
+		""" Return the state of the scheduler as a string of bytes, for restore().
+		
+		It holds the values of the condition variables and, for every task,
+		its RestartableTask with its attributes, its state and what it waits
+		for. All tasks must be restartable, and none waiting for a future.
+		Task groups are not saved.
+		"""
+		if self.current_task is not None:
+			raise RuntimeError('Scheduler.snapshot() called within a task.')
+		now = self.current_time()
+		values = self.__dict__
+		cv_values = dict((name, values[name]) for name in self._cv_names if name in values)
+		# tasks in the order of the ready queue first, to keep it
+		tasks = []
+		seen = set()
+		for task in self.ready:
+			if task.tid in self.taskmap and task not in seen:
+				seen.add(task)
+				tasks.append(task)
+		tasks.extend(task for tid, task in sorted(self.taskmap.iteritems()) if task not in seen)
+		class_paths = []
+		class_indices = {}
+		records = []
+		for task in tasks:
+			restartable = task.restartable
+			if restartable is None:
+				raise ValueError('%s is not restartable' % task)
+			if task.future is not None:
+				raise ValueError('%s waits for a future' % task)
+			if task.channel is not None:
+				raise ValueError('%s waits on a channel' % task)
+			cls = type(restartable)
+			index = class_indices.get(cls)
+			if index is None:
+				index = class_indices[cls] = len(class_paths)
+				class_paths.append(cls.__module__ + '.' + cls.__name__)
+			remaining = None
+			if task.timer is not None:
+				remaining = self._timer_callback_time(task.timer) - now
+			records.append((task.tid, index, restartable.__dict__, task.state, task.priority, task.deadline,
+				task.waitmode, remaining, tuple(self.exit_waited.get(task, ())), task.condition is not None))
+		body = marshal.dumps((cv_values, class_paths, records), 2)
+		return Scheduler.SNAPSHOT_HEADER.pack(Scheduler.SNAPSHOT_MAGIC, Scheduler.SNAPSHOT_VERSION, len(records)) + body
+	
+	def restore(self, data):
+		""" Restore the condition variables and tasks of a snapshot, return the identifiers of the restored tasks """
+		if self.current_task is not None:
+			raise RuntimeError('Scheduler.restore() called within a task.')
+		header_size = Scheduler.SNAPSHOT_HEADER.size
+		magic, version, count = Scheduler.SNAPSHOT_HEADER.unpack(data[:header_size])
+		if magic != Scheduler.SNAPSHOT_MAGIC or version != Scheduler.SNAPSHOT_VERSION:
+			raise ValueError('not a snapshot of version %d' % Scheduler.SNAPSHOT_VERSION)
+		cv_values, class_paths, records = marshal.loads(data[header_size:])
+		if len(records) != count:
+			raise ValueError('truncated snapshot')
+		for record in records:
+			if record[0] in self.taskmap:
+				raise ValueError('task %d already exists' % record[0])
+		# without collections of the many objects created, none of them being garbage
+		gc_enabled = gc.isenabled()
+		gc.disable()
+		try:
+			classes = map(self._import_class, class_paths)
+			# the values are set without evaluating conditions, as they are waited for again below
+			self.__dict__.update(cv_values)
+			# create all tasks first, for the waits between them
+			tasks = []
+			for tid, index, attributes, state, priority, deadline, waitmode, remaining, waited_tids, waits_condition in records:
+				cls = classes[index]
+				restartable = cls.__new__(cls)
+				restartable.__dict__.update(attributes)
+				task = self._create_task(restartable, tid)
+				task.throwval = Task.START
+				task.priority = priority
+				task.deadline = deadline
+				task.waitmode = waitmode
+				if (priority != 0 or deadline is not None) and not isinstance(self.ready, PriorityReadyQueue):
+					self.ready = PriorityReadyQueue(self.current_time, self.ready)
+				self.taskmap[tid] = task
+				tasks.append(task)
+				self._log_task_created(task)
+			for task, record in zip(tasks, records):
+				state, remaining, waited_tids, waits_condition = record[3], record[7], record[8], record[9]
+				if state in (Task.READY, Task.PAUSED_READY):
+					self._schedule(task)
+				elif remaining is not None:
+					self._wait_duration(task, max(remaining, 0.))
+				elif waited_tids:
+					for tid in waited_tids:
+						self._wait_for_exit(task, tid)
+				elif waits_condition:
+					self._wait_condition(task, task.restartable.condition(self))
+				if state in (Task.PAUSED_READY, Task.PAUSED_WAIT):
+					task.state = Task.PAUSE[task.state]
+		finally:
+			if gc_enabled:
+				gc.enable()
+		return [task.tid for task in tasks]
+	
+	def step(self, max_slices=None, max_time=None):
+		""" Run tasks until none is ready or a budget is exhausted, return the number of slices run.
+		
+		At most max_slices slices are run, and no new slice is started after
+		max_time seconds, at least one slice being run. Within a priority level,
+		a task that yields goes back behind all other ready tasks, and tasks
+		left ready when a budget is exhausted keep their place for the next step,
+		so every ready task runs once before any of them runs twice.
+		"""
 		if self.current_task is not None:
 			raise RuntimeError('Scheduler.step() called within a task.')
+		if self.inbox:
+			self._process_inbox()
+		# after the inbox, so that a replay sets the variables set from other threads before stepping
+		if self.recorder is not None:
+			self.recorder.step(self.current_time())
+		profiler = self.profiler
+		overrun_duration = self.overrun_duration
+		if max_time is not None:
+			end_time = time.time() + max_time
+		slices = 0
 		while self.ready:
+			if max_slices is not None and slices >= max_slices:
+				break
+			if max_time is not None and slices and time.time() >= end_time:
+				break
 			task = self.ready.popleft()
+			task.queued = False
+			if task.state != Task.READY:
+				# paused or terminated since it was scheduled
+				continue
+			group = task.group
+			if group is not None:
+				paused_group = group.paused_group()
+				if paused_group is not None:
+					# keep the entry aside until the group is resumed
+					task.queued = True
+					paused_group.parked.append(task)
+					continue
+				group.slices += 1
+			task.state = Task.WAITING
+			slices += 1
 			try:
 				#print 'Running ' + str(task)
 				self.current_task = task
-				result = task.run()
+				if overrun_duration is not None:
+					result = self._run_timed(task, profiler, overrun_duration)
+				elif profiler is None:
+					result = task.run()
+				else:
+					result = profiler.run(task, len(self.ready))
 				self.current_task = None
 				if isinstance(result,SystemCall):
-					result.task  = task
-					result.sched = self
-					result.handle()
+					result._dispatch(self, task)
 					#print 'ready queue B: ' + str(self.ready)
 					continue
 			except StopIteration:
 				self.current_task = None
 				self._exit(task)
 				continue
+			except BaseException:
+				if self.current_task is task:
+					# the exception escaped the task, which is dead
+					exc_info = sys.exc_info()
+					self.current_task = None
+					self._exit(task)
+					raise exc_info[0], exc_info[1], exc_info[2]
+				raise
 			self._schedule(task)
+		return slices
 	
 	# Public API, these functions are safe to be called from within a task or from outside
 	# these functions can be overriden by children
@@ -243,133 +1803,512 @@ class Scheduler(object):
 	# these functions can be overriden by children
 	
 	def _sleep(self, duration):
-		""" Sleep a certain amount of time """
-		time.sleep(duration)
+		""" Sleep a certain amount of time, forever if None, or until woken up by another thread """
+		if not self.inbox:
+			self.wakeup_pipe.sleep(duration)
 	
-	def _set_timer_callback(self, t, f):
-		""" Execute function f at time t """
+	def _wakeup(self):
+		""" Wake _sleep() up, can be called from any thread """
+		self.wakeup_pipe.wake_up()
+	
+	def _process_inbox(self):
+		""" Call the functions sent from other threads """
+		inbox = self.inbox
+		while inbox:
+			f, args = inbox.popleft()
+			f(*args)
+	
+	def _set_timer_callback(self, t, f, *args):
+		""" Execute function f(*args) at time t, return a handle for _cancel_timer_callback """
+		raise NotImplementedError('timer callback mechanism must be provided by derived class')
+	
+	def _cancel_timer_callback(self, handle):
+		""" Cancel a timer callback, return whether it was pending """
+		raise NotImplementedError('timer callback mechanism must be provided by derived class')
+	
+	def _wait_future(self, task, future):
+		""" Set task waiting for a concurrent.futures future, its result is sent to the task or its exception raised in it """
+		task.future = future
+		self.pending_futures += 1
+		# the callback is called by the thread completing the future
+		future.add_done_callback(functools.partial(self.call_soon_threadsafe, self._resume_future, task))
+	
+	def _resume_future(self, task, future):
+		""" Resume task waiting for future, now done """
+		self.pending_futures -= 1
+		if task.future is not future:
+			# killed in the meantime
+			return
+		task.future = None
+		try:
+			task.sendval = future.result()
+		except Exception as e:
+			task.throwval = e
+		self._schedule(task)
+	
+	def _run_in_executor(self, task, executor, fn, args):
+		""" Set task waiting for fn(*args) to be run by executor """
+		self._wait_future(task, executor.submit(fn, *args))
+	
+	def _get_process_pool(self):
+		""" Return the executor of RunInPool, creating it if needed """
+		if self.process_pool is None:
+			import concurrent.futures
+			self.process_pool = concurrent.futures.ProcessPoolExecutor()
+		return self.process_pool
+	
+	def _get_thread_pool(self):
+		""" Return the executor of RunInThread, creating it if needed """
+		if self.thread_pool is None:
+			import concurrent.futures
+			self.thread_pool = concurrent.futures.ThreadPoolExecutor(self.thread_pool_workers)
+		return self.thread_pool
+	
+	def _timer_callback_time(self, handle):
+		""" Return the time of a timer callback """
 		raise NotImplementedError('timer callback mechanism must be provided by derived class')
 	
 	def _log_task_created(self, task):
 		""" Log for task created """
-		print time.ctime() + " - Task %s (tid %d) created" % (task.target.__name__, task.tid)
+		sink = self.log_sink
+		if sink is not None and sink.level <= LogSink.INFO:
+			sink.emit(LogSink.INFO, time.time(), 'Task %s (tid %d) created', (task.name, task.tid))
 	
 	def _log_task_terminated(self, task):
 		""" Log for task terminated """
-		print time.ctime() + " - Task %s (tid %d) terminated" % (task.target.__name__, task.tid)
+		sink = self.log_sink
+		if sink is not None and sink.level <= LogSink.INFO:
+			sink.emit(LogSink.INFO, time.time(), 'Task %s (tid %d) terminated', (task.name, task.tid))
+	
+	def _log_task_overrun(self, task, duration):
+		""" Log for a slice of task lasting longer than overrun_duration """
+		sink = self.log_sink
+		if sink is not None and sink.level <= LogSink.WARNING:
+			sink.emit(LogSink.WARNING, time.time(), 'Task %s (tid %d) overran its slice: %.3f ms (overrun %d)',
+				(task.name, task.tid, duration * 1000., task.overruns))
 	
 	# Protected implementations, these functions can only be called by functions from this object
 
+	def _create_task(self, target, tid=None):
+		""" Create a task from function target or a RestartableTask, reusing a terminated task if possible """
+		restartable = None
+		if isinstance(target, RestartableTask):
+			restartable = target
+			target = restartable.run(self)
+		if self.task_freelist:
+			task = self.task_freelist.pop()
+			task.__init__(target, tid)
+		else:
+			task = Task(target, tid)
+		if restartable is not None:
+			task.name = type(restartable).__name__
+			task.restartable = restartable
+		return task
+	
+	def _import_class(self, path):
+		""" Return the class of a path module.name """
+		module_name, name = path.rsplit('.', 1)
+		__import__(module_name)
+		return getattr(sys.modules[module_name], name)
+	
+	def _run_timed(self, task, profiler, overrun_duration):
+		""" Run a slice of task, reporting it if it lasts longer than overrun_duration """
+		start_time = time.time()
+		try:
+			if profiler is None:
+				return task.run()
+			else:
+				return profiler.run(task, len(self.ready))
+		finally:
+			duration = time.time() - start_time
+			if duration > overrun_duration:
+				task.overruns += 1
+				self._log_task_overrun(task, duration)
+
 	def _exit(self,exiting_task):
 		""" Handle the termination of a task """
 		self._log_task_terminated(exiting_task)
-		del self.taskmap[exiting_task.tid]
-		# Notify other tasks waiting for exit
-		to_remove_keys = []
-		for task in self.exit_waiting.pop(exiting_task.tid,[]):
+		if self.recorder is not None:
+			self.recorder.task_exited(self.current_time(), exiting_task.tid)
+		exiting_task.state = Task.DONE
+		exiting_tid = exiting_task.tid
+		del self.taskmap[exiting_tid]
+		group = exiting_task.group
+		if group is not None:
+			group.tids.discard(exiting_tid)
+			group.terminated += 1
+			exiting_task.group = None
+			if not group.tids and not group.children:
+				group._detach()
+		# reuse the task later, unless it is still referred to by an entry in the ready queue or a timer being fired
+		if not exiting_task.queued and exiting_task.timer is None and len(self.task_freelist) < Scheduler.TASK_FREELIST_SIZE:
+			exiting_task.target = None
+			exiting_task.sendval = None
+			exiting_task.throwval = None
+			exiting_task.restartable = None
+			self.task_freelist.append(exiting_task)
+		# Notify other tasks waiting for exit, only touching the edges involved
+		waiting_tasks = self.exit_waiting.pop(exiting_tid, None)
+		if not waiting_tasks:
+			return
+		# wake-up in tid order, so that the behaviour is deterministic
+		if len(waiting_tasks) > 1:
+			waiting_tasks = sorted(waiting_tasks, key=lambda task: task.tid)
+		for task in waiting_tasks:
+			waited_tids = self.exit_waited[task]
+			waited_tids.discard(exiting_tid)
 			if task.waitmode == Task.WAIT_ANY:
 				# remove associations to other tasks waited on
-				for waited_tid, waiting_tasks_list in self.exit_waiting.iteritems():
-					# remove task form list of waiting tasks if in there
-					for waiting_task in waiting_tasks_list:
-						if waiting_task.tid == task.tid:
-							waiting_tasks_list.remove(waiting_task)
-				# return the tid of the exiting_task 
-				task.sendval = exiting_task.tid
+				for waited_tid in waited_tids:
+					self._unwait_for_exit(task, waited_tid)
+				waited_tids.clear()
+			# for WAIT_ALL, the size of waited_tids is the number of tasks remaining
+			if not waited_tids:
+				del self.exit_waited[task]
+				# return the tid of the exiting_task
+				task.sendval = exiting_tid
 				self._schedule(task)
-			else:
-				are_still_waiting = False
-				for waited_tid, waiting_tasks_list in self.exit_waiting.iteritems():
-					for waiting_task in waiting_tasks_list:
-						if waiting_task.tid == task.tid:
-							are_still_waiting = True
-				if not are_still_waiting:
-					# return the tid of the exiting_task 
-					task.sendval = exiting_task.tid
-					self._schedule(task)
-		self.exit_waiting = dict((k,v) for (k,v) in self.exit_waiting.iteritems() if v)
 
 	def _wait_for_exit(self,task,waittid):
 		""" Set task waiting of the exit of task waittid """
 		if waittid in self.taskmap:
-			self.exit_waiting.setdefault(waittid,[]).append(task)
+			self.exit_waiting.setdefault(waittid,set()).add(task)
+			self.exit_waited.setdefault(task,set()).add(waittid)
 			return True
 		else:
 			return False
 
+	def _unwait_for_exit(self,task,waittid):
+		""" Remove the edge between task and the task waittid it waits for """
+		waiting_tasks = self.exit_waiting.get(waittid)
+		if waiting_tasks is not None:
+			waiting_tasks.discard(task)
+			if not waiting_tasks:
+				del self.exit_waiting[waittid]
+
 	def _schedule(self,task):
-		if task in self.paused_in_syscall:
-			self.paused_in_syscall.remove(task)
-			self.paused_in_ready.add(task)
-		else:
-			self.ready.append(task)
+		if task.state == Task.PAUSED_WAIT:
+			task.state = Task.PAUSED_READY
+		elif task.state != Task.DONE:
+			task.state = Task.READY
+			if not task.queued:
+				task.queued = True
+				self.ready.append(task)
 	
 	def _schedule_now(self,task):
-		if task in self.paused_in_syscall:
-			self.paused_in_syscall.remove(task)
-			self.paused_in_ready.add(task)
-		else:
-			self.ready.appendleft(task)
+		if task.state == Task.PAUSED_WAIT:
+			task.state = Task.PAUSED_READY
+		elif task.state != Task.DONE:
+			task.state = Task.READY
+			if not task.queued:
+				task.queued = True
+				self.ready.appendleft(task)
 		
-	def _wait_duration(self,task,duration):
-		def resume(task):
+	def _cancel_waits(self,task):
+		""" Remove task from the timers, conditions and tasks it waits for """
+		if task.timer is not None:
+			# if it is being fired, the timer is kept so that the task is not reused before
+			if self._cancel_timer_callback(task.timer):
+				task.timer = None
+		if task.condition is not None:
+			if isinstance(task.condition, PredicateWait):
+				self._unindex_predicate(task.condition)
+			else:
+				self._del_condition(task.condition)
+			task.condition = None
+		for waited_tid in self.exit_waited.pop(task, ()):
+			self._unwait_for_exit(task, waited_tid)
+		if task.future is not None:
+			task.future.cancel()
+			task.future = None
+		if task.channel is not None:
+			task.channel._remove(task)
+			task.channel = None
+	
+	def _send(self, task, channel, message):
+		""" Send message on channel, parking task while the channel is full """
+		if channel.sched is not self:
+			# raised in the task, not out of step()
+			task.throwval = ValueError('channel of another scheduler')
+			self._schedule_now(task)
+			return
+		if channel.receivers:
+			# hand the message over
+			receiver = channel.receivers.popleft()
+			receiver.channel = None
+			receiver.sendval = message
+			self._schedule(receiver)
+		elif len(channel.messages) < channel.capacity:
+			channel.messages.append(message)
+		else:
+			task.channel = channel
+			channel.senders.append((task, message))
+			return
+		self._schedule_now(task)
+	
+	def _recv(self, task, channel):
+		""" Receive a message from channel for task, parking it while the channel is empty """
+		if channel.sched is not self:
+			# raised in the task, not out of step()
+			task.throwval = ValueError('channel of another scheduler')
 			self._schedule_now(task)
-		self._set_timer_callback(self.current_time()+duration, lambda: resume(task))
+			return
+		messages = channel.messages
+		if messages:
+			task.sendval = messages.popleft()
+			if channel.senders:
+				# room for the message of the first parked sender
+				sender, message = channel.senders.popleft()
+				sender.channel = None
+				messages.append(message)
+				self._schedule(sender)
+		elif channel.senders:
+			# without capacity, take the message from the sender
+			sender, message = channel.senders.popleft()
+			sender.channel = None
+			task.sendval = message
+			self._schedule(sender)
+		else:
+			task.channel = channel
+			channel.receivers.append(task)
+			return
+		self._schedule_now(task)
 	
-	def _wait_duration_rate(self,task,duration,rate):
-		def resume(task,rate):
-			# get current time
-			rate.last_time = self.current_time()
-			# if not paused, execute the resumed task directly once we exit the syscall
+	def _reserve(self, task, channel):
+		""" Give a free slot of ring buffer channel to task, parking it until one is released if none is free """
+		if channel.sched is not self:
+			# raised in the task, not out of step()
+			task.throwval = ValueError('channel of another scheduler')
 			self._schedule_now(task)
-		self._set_timer_callback(self.current_time()+duration, lambda: resume(task, rate))
+			return
+		if channel.free:
+			slot = channel.free.popleft()
+			channel.reserved.add(id(slot))
+			task.sendval = slot
+			self._schedule_now(task)
+		else:
+			task.channel = channel
+			channel.reservers.append(task)
+	
+	def _wait_duration(self,task,duration):
+		task.timer = self._set_timer_callback(self.current_time()+duration, self._resume_duration, task)
+	
+	def _resume_duration(self,task):
+		task.timer = None
+		self._schedule_now(task)
+	
+	def _wait_duration_rate(self,task,duration,rate):
+		task.timer = self._set_timer_callback(self.current_time()+duration, self._resume_rate, task, rate)
+	
+	def _resume_rate(self,task,rate):
+		task.timer = None
+		# get current time
+		rate.last_time = self.current_time()
+		# if not paused, execute the resumed task directly once we exit the syscall
+		self._schedule_now(task)
 	
 	def _add_condition(self,entry):
 		condition = entry[0]
-		vars_in_cond = dict(inspect.getmembers(dict(inspect.getmembers(condition))['func_code']))['co_names']
-		for var in vars_in_cond:
+		for var in self._condition_names(condition):
 			if var not in self.cond_waiting:
 				self.cond_waiting[var] = []
 			self.cond_waiting[var].append(entry)
 	
 	def _del_condition(self,candidate):
 		(condition, task) = candidate
-		vars_in_cond = dict(inspect.getmembers(dict(inspect.getmembers(condition))['func_code']))['co_names']
-		for var in vars_in_cond:
+		for var in self._condition_names(condition):
 			if var in self.cond_waiting:
 				self.cond_waiting[var].remove(candidate)
 				if not self.cond_waiting[var]:
 					del self.cond_waiting[var]
 	
+	# Cache of dependencies, map of: (scheduler class, code object) => tuple of names
+	_condition_names_cache = {}
+	
+	def _condition_names(self, condition):
+		""" Return the names of the condition variables a condition depends on """
+		code = getattr(condition, 'func_code', None)
+		if code is None:
+			# not a function, we cannot know, so depend on all condition variables
+			return tuple(self._cv_names)
+		key = (type(self), code)
+		names = Scheduler._condition_names_cache.get(key)
+		if names is None:
+			names = set()
+			cacheable = self._collect_condition_names(condition, names, set())
+			names = tuple(names)
+			if cacheable:
+				Scheduler._condition_names_cache[key] = names
+		return names
+	
+	def _collect_condition_names(self, function, names, visited):
+		""" Add the condition variables read by function to names, return whether the result only depends on the code of function """
+		cv_names = self._cv_names
+		cacheable = True
+		codes = [function.func_code]
+		while codes:
+			code = codes.pop()
+			if code in visited:
+				continue
+			visited.add(code)
+			# co_names holds both global names and attributes, such as energy_level in sched.energy_level
+			for name in code.co_names:
+				if name in cv_names:
+					names.add(name)
+					continue
+				# follow methods of the scheduler and global helper functions
+				value = self._class_member(name)
+				if value is None:
+					value = function.func_globals.get(name)
+				if isinstance(value, types.FunctionType):
+					cacheable = self._collect_condition_names(value, names, visited) and cacheable
+			# nested code, such as generator expressions
+			for const in code.co_consts:
+				if isinstance(const, types.CodeType):
+					codes.append(const)
+		# follow helper functions in closures, these might differ for the same code
+		for cell in function.func_closure or ():
+			try:
+				value = cell.cell_contents
+			except ValueError:
+				continue
+			if isinstance(value, types.FunctionType):
+				self._collect_condition_names(value, names, visited)
+				cacheable = False
+		return cacheable
+	
+	def _class_member(self, name):
+		""" Return the member name of the class of this scheduler without invoking descriptors, None if not found """
+		for klass in type(self).__mro__:
+			if name in klass.__dict__:
+				return klass.__dict__[name]
+		return None
+	
 	def _wait_condition(self,task,condition):
+		if isinstance(condition, Predicate):
+			self._wait_predicate(task, condition)
+			return
 		# add a new condition and directly evalutate it once
 		entry = (condition,task)
 		if not condition():
 			self._add_condition(entry)
+			task.condition = entry
 		else:
 			self._schedule_now(task)
 		
 	def _test_conditions(self, name):
 		# is there any task waiting on this name?
-		if name not in self.cond_waiting:
+		if name not in self.cond_waiting and name not in self.threshold_indexes:
+			return
+		# if in a batch, evaluate later
+		if self.batch is not None:
+			self.batch._defer(name, len(self.cond_waiting.get(name, ())))
+			return
+		# check which thresholds are crossed and which conditions are true
+		self._test_thresholds(name)
+		if name in self.cond_waiting:
+			self._evaluate_conditions(copy.copy(self.cond_waiting[name]))
+	
+	def _wait_predicate(self, task, predicate):
+		""" Set task waiting for a predicate, indexing its thresholds """
+		for threshold in predicate.leaves():
+			if threshold.name not in self._cv_names:
+				# raised in the task, not out of step()
+				task.throwval = AttributeError("'%s' is not a condition variable" % threshold.name)
+				self._schedule_now(task)
+				return
+		if predicate.evaluate(self):
+			self._schedule_now(task)
+			return
+		wait = PredicateWait(predicate, task)
+		self._index_predicate(wait)
+		task.condition = wait
+	
+	def _index_predicate(self, wait):
+		""" Add the false thresholds of the predicate of wait to the indexes.
+		
+		As predicates have no negation, they can only become true when one of
+		these thresholds becomes true, the predicate is then evaluated again.
+		"""
+		indexes = self.threshold_indexes
+		for threshold in wait.predicate.leaves():
+			if not threshold.evaluate(self):
+				index = indexes.get(threshold.name)
+				if index is None:
+					index = indexes[threshold.name] = threshold.new_index()
+				wait.entries.append((index, threshold, index.add(threshold, wait)))
+	
+	def _unindex_predicate(self, wait):
+		""" Remove the thresholds of the predicate of wait from the indexes """
+		for index, threshold, entry in wait.entries:
+			index.remove(threshold, entry)
+			if not index.count and self.threshold_indexes.get(threshold.name) is index:
+				del self.threshold_indexes[threshold.name]
+		wait.entries = []
+	
+	def _test_thresholds(self, name):
+		""" Schedule the tasks whose predicates became true when condition variable name changed """
+		index = self.threshold_indexes.get(name)
+		if index is None:
 			return
-		# check which conditions are true
-		candidates = copy.copy(self.cond_waiting[name])
+		for entry in index.crossed(getattr(self, name)):
+			wait = entry[2]
+			task = wait.task
+			if task.condition is not wait:
+				# already woken by another threshold
+				continue
+			self._unindex_predicate(wait)
+			if wait.predicate.evaluate(self):
+				# a paused task is resumed ready
+				task.condition = None
+				self._schedule(task)
+			else:
+				self._index_predicate(wait)
+	
+	def _evaluate_conditions(self, candidates):
+		""" Schedule the tasks whose conditions are true, return the number of conditions evaluated """
+		evaluations = 0
 		for candidate in candidates:
 			(condition, task) = candidate
-			if task not in self.paused_in_syscall and condition():
-				self._schedule(task)
-				self._del_condition(candidate)
+			if task.state != Task.PAUSED_WAIT:
+				evaluations += 1
+				if condition():
+					task.condition = None
+					self._schedule(task)
+					self._del_condition(candidate)
+		if self.profiler is not None:
+			self.profiler.condition_evaluations += evaluations
+		return evaluations
+	
+	def _commit_batch(self, batch):
+		""" Evaluate once each condition depending on the variables changed in batch """
+		self.batch = None
+		candidates = []
+		seen = set()
+		for name in batch.dirty:
+			self._test_thresholds(name)
+			for candidate in self.cond_waiting.get(name, ()):
+				if candidate not in seen:
+					seen.add(candidate)
+					candidates.append(candidate)
+		batch.evaluations = self._evaluate_conditions(candidates)
+		batch.saved = max(0, batch.deferred - batch.evaluations)
 
 
 class TimerScheduler(Scheduler):
-	""" A scheduler that sleeps when there is nothing to do. """
+	""" A scheduler that sleeps when there is nothing to do.
 	
-	def __init__(self):
+	The timers are kept in timer_queue, by default a HeapTimerQueue. From
+	about 100k timers, a WheelTimerQueue is cheaper, at the price of firing
+	timers at the resolution of the wheel.
+	"""
+	
+	def __init__(self, timer_queue=None):
 		""" Initialize """
 		super(TimerScheduler, self).__init__()
-		self.timer_cb = []
-		self.timer_counter = 0
+		if timer_queue is None:
+			timer_queue = HeapTimerQueue()
+		self.timer_cb = timer_queue
 	
 	# Public API, these funtions must be called outside a task
 	
@@ -377,35 +2316,473 @@ class TimerScheduler(Scheduler):
 		""" Run until there is no task to schedule """
 		if self.current_task is not None:
 			raise RuntimeError('TimerScheduler.run() called within a task.')
-		while self.timer_cb or self.ready or self.cond_waiting:
+		while self.timer_cb or self.ready or self.cond_waiting or self.threshold_indexes or self.inbox or self.pending_futures:
 			self.step()
-			t, counter, f = heapq.heappop(self.timer_cb)
+			t = self.timer_cb.next_time()
+			if t is None:
+				if not self.cond_waiting and not self.threshold_indexes and not self.pending_futures:
+					continue
+				# only other threads can change conditions or complete futures now
+				self._sleep(None)
+				continue
 			duration = t - self.current_time()
 			if duration >= 0:
 				self._sleep(duration)
-			f()
-			self.step()
+			now = self.current_time()
+			for timer in self.timer_cb.pop_due(now):
+				self._fire_timer(timer, now)
+				self.step()
 	
-	def timer_step(self):
-		""" Schedule all tasks with past deadlines and step """
+	def timer_step(self, max_slices=None, max_time=None):
+		""" Schedule all tasks with past deadlines and step within the given budgets, return the number of slices run """
 		if self.current_task is not None:
 			raise RuntimeError('TimerScheduler.timer_step() called within a task.')
-		while self.timer_cb:
-			t, counter, f = heapq.heappop(self.timer_cb)
-			duration = t - self.current_time()
-			if duration <= 0:
-				f()
-			else:
-				heapq.heappush(self.timer_cb, [t, counter, f])
-				break
-		self.step()
+		now = self.current_time()
+		for timer in self.timer_cb.pop_due(now):
+			self._fire_timer(timer, now)
+		return self.step(max_slices, max_time)
 	
 	# Protected implementations, these functions can only be called by functions from this object
 	
-	def _set_timer_callback(self, t, f):
+	def _set_timer_callback(self, t, f, *args):
 		""" Implement the timer callback """
-		heapq.heappush(self.timer_cb, [t, self.timer_counter, f])
-		self.timer_counter += 1
+		if not self.timer_cb:
+			# let an empty queue catch up with the current time
+			self.timer_cb.pop_due(self.current_time())
+		return self.timer_cb.add(t, f, args)
+	
+	def _cancel_timer_callback(self, handle):
+		""" Implement the cancellation of timer callback """
+		return self.timer_cb.cancel(handle)
+	
+	def _timer_callback_time(self, handle):
+		""" Implement the time of timer callback """
+		return handle.t
+	
+	def _fire_timer(self, timer, now):
+		if self.profiler is not None:
+			self.profiler.timer_lag(now - timer.t)
+		if self.recorder is not None:
+			self.recorder.timer_fired(now, timer.t)
+		timer.f(*timer.args)
+	
+class SimulatedTimeScheduler(TimerScheduler):
+	""" A scheduler with a virtual clock, jumping to the time of the next timer instead of sleeping.
+	
+	The clock starts at start_time and only advances when no task is ready.
+	Runs are deterministic, as long as tasks do not depend on other threads
+	or on the real time, so long durations are simulated quickly.
+	"""
+	
+	def __init__(self, start_time=0., timer_queue=None):
+		""" Initialize """
+		super(SimulatedTimeScheduler, self).__init__(timer_queue)
+		self.now = start_time
+	
+	# Public API, these functions are safe to be called from within a task or from outside
+	
+	def current_time(self):
+		""" Return the virtual time """
+		return self.now
+	
+	# Public API, these funtions must be called outside a task
+	
+	def run(self):
+		""" Run until there is no task to schedule """
+		self.run_until(None)
+	
+	def run_until(self, end_time):
+		""" Run until the virtual time end_time, or until there is no task to schedule if end_time is None.
+		
+		With end_time None, it returns when no timer is left and no future is
+		pending, even if tasks still wait for conditions, as nothing else in the
+		simulation can change them.
+		"""
+		if self.current_task is not None:
+			raise RuntimeError('SimulatedTimeScheduler.run_until() called within a task.')
+		while True:
+			self.step()
+			if self.ready or self.inbox:
+				continue
+			t = self.timer_cb.next_time()
+			if t is None or (end_time is not None and t > end_time):
+				if end_time is not None:
+					if end_time > self.now:
+						self.now = end_time
+					return
+				if not self.pending_futures:
+					return
+				# only other threads can complete futures now
+				self._sleep(None)
+				continue
+			if t > self.now:
+				self.now = t
+			for timer in self.timer_cb.pop_due(self.now):
+				self._fire_timer(timer, self.now)
+				self.step()
+	
+class AsyncioScheduler(Scheduler):
+	""" A scheduler driven by an asyncio event loop, to share a thread with asyncio code.
+	
+	Timers are implemented with loop.call_at() and the tasks are stepped by
+	the loop whenever some are ready. Tasks can wait for asyncio futures and
+	coroutines using WaitFuture. Under Python 2, trollius is used.
+	"""
+	
+	def __init__(self, loop=None):
+		""" Initialize """
+		super(AsyncioScheduler, self).__init__()
+		try:
+			import asyncio
+		except ImportError:
+			import trollius as asyncio
+		self.asyncio = asyncio
+		if loop is None:
+			loop = asyncio.get_event_loop()
+		self.loop = loop
+		# Pending call of step() by the loop, None if there is none
+		self.step_handle = None
+		self.stepping = False
+		# Futures done when no task is left, see join()
+		self.joining = []
+	
+	# Public API, these functions are safe to be called from within a task or from outside
+	
+	def join(self):
+		""" Return a future done when there is no task left """
+		future = self.asyncio.Future(loop=self.loop)
+		if self.taskmap:
+			self.joining.append(future)
+		else:
+			future.set_result(None)
+		return future
+	
+	def current_time(self):
+		""" Return the time of the loop """
+		return self.loop.time()
+	
+	# Public API, these funtions must be called outside a task
+	
+	def run(self):
+		""" Run the loop until there is no task left """
+		if self.current_task is not None:
+			raise RuntimeError('AsyncioScheduler.run() called within a task.')
+		self.loop.run_until_complete(self.join())
+	
+	def step(self, max_slices=None, max_time=None):
+		""" Run tasks until none is ready or a budget is exhausted, return the number of slices run """
+		self.stepping = True
+		try:
+			return super(AsyncioScheduler, self).step(max_slices, max_time)
+		finally:
+			self.stepping = False
+			if self.ready:
+				# budget exhausted or a task failed, let the loop continue later
+				self._request_step()
+	
+	def resume_tasks(self, tids):
+		""" Resume the execution of multiple tasks, return the list of resumed tasks """
+		resumed = super(AsyncioScheduler, self).resume_tasks(tids)
+		self._request_step()
+		return resumed
+	
+	def resume_group(self, group):
+		""" Resume a paused group, in the number of its tasks that became ready, return whether the group was resumed """
+		resumed = super(AsyncioScheduler, self).resume_group(group)
+		self._request_step()
+		return resumed
+	
+	# Protected implementations, these functions can only be called by functions from this object
+	
+	def _set_timer_callback(self, t, f, *args):
+		""" Implement the timer callback with the loop, the handle is a tuple of t and the handle of the loop """
+		return (t, self.loop.call_at(t, self._fire_timer, t, f, args))
+	
+	def _cancel_timer_callback(self, handle):
+		""" Implement the cancellation of timer callback """
+		handle[1].cancel()
+		return True
+	
+	def _timer_callback_time(self, handle):
+		""" Implement the time of timer callback """
+		return handle[0]
+	
+	def _fire_timer(self, t, f, args):
+		if self.profiler is not None:
+			self.profiler.timer_lag(self.loop.time() - t)
+		if self.recorder is not None:
+			self.recorder.timer_fired(self.loop.time(), t)
+		f(*args)
+		self._step_from_loop()
+	
+	def _wait_future(self, task, future):
+		""" Implement waiting for an asyncio future or coroutine """
+		future = self.asyncio.ensure_future(future, loop=self.loop)
+		task.future = future
+		future.add_done_callback(functools.partial(self._resume_future, task))
+	
+	def _run_in_executor(self, task, executor, fn, args):
+		""" Implement running fn(*args) in executor with the loop """
+		self._wait_future(task, self.loop.run_in_executor(executor, fn, *args))
+	
+	def _resume_future(self, task, future):
+		if task.future is not future:
+			# killed in the meantime
+			return
+		task.future = None
+		if future.cancelled():
+			task.throwval = self.asyncio.CancelledError()
+		elif future.exception() is not None:
+			task.throwval = future.exception()
+		else:
+			task.sendval = future.result()
+		self._schedule(task)
+	
+	def _schedule(self, task):
+		super(AsyncioScheduler, self)._schedule(task)
+		self._request_step()
+	
+	def _schedule_now(self, task):
+		super(AsyncioScheduler, self)._schedule_now(task)
+		self._request_step()
+	
+	def _request_step(self):
+		""" Let the loop call step() soon, unless already stepping """
+		if not self.stepping and self.step_handle is None:
+			self.step_handle = self.loop.call_soon(self._step_soon)
+	
+	def _wakeup(self):
+		""" Let the loop process the inbox, can be called from any thread """
+		self.loop.call_soon_threadsafe(self._step_from_thread)
+	
+	def _step_from_thread(self):
+		if self.current_task is None:
+			self._step_from_loop()
+	
+	def _step_soon(self):
+		self.step_handle = None
+		if self.current_task is None:
+			self._step_from_loop()
+	
+	def _step_from_loop(self):
+		""" Step from a callback of the loop, an exception escaping a task is set on the futures of join(), if any """
+		try:
+			self.step()
+		except Exception as e:
+			if not self.joining:
+				# reported by the exception handler of the loop
+				raise
+			for future in self.joining:
+				if not future.done():
+					future.set_exception(e)
+			self.joining = []
+	
+	def _exit(self, exiting_task):
+		super(AsyncioScheduler, self)._exit(exiting_task)
+		if not self.taskmap and self.joining:
+			# after the current step, which might still fail
+			self.loop.call_soon(self._resolve_joining)
+	
+	def _resolve_joining(self):
+		if self.taskmap:
+			return
+		for future in self.joining:
+			if not future.done():
+				future.set_result(None)
+		self.joining = []
+	
+class FleetScheduler(Scheduler):
+	""" A scheduler run by a Fleet, with many others, in the thread of the fleet.
+	
+	It keeps its own tasks and condition variables, but its timers are in
+	the timer queue of the fleet, which steps it only when it has ready tasks.
+	"""
+	
+	def __init__(self, fleet):
+		""" Initialize and join fleet """
+		super(FleetScheduler, self).__init__()
+		self.fleet = fleet
+		# Whether this scheduler is in the ready list of the fleet
+		self.fleet_queued = False
+		fleet.schedulers.append(self)
+	
+	# Public API, these functions are safe to be called from within a task or from outside
+	
+	def current_time(self):
+		""" Return the time of the fleet """
+		return self.fleet.current_time()
+	
+	def resume_tasks(self, tids):
+		""" Resume the execution of multiple tasks, return the list of resumed tasks """
+		resumed = super(FleetScheduler, self).resume_tasks(tids)
+		self._request_step()
+		return resumed
+	
+	def resume_group(self, group):
+		""" Resume a paused group, in the number of its tasks that became ready, return whether the group was resumed """
+		resumed = super(FleetScheduler, self).resume_group(group)
+		self._request_step()
+		return resumed
+	
+	# Protected implementations, these functions can only be called by functions from this object
+	
+	def _set_timer_callback(self, t, f, *args):
+		""" Implement the timer callback with the queue of the fleet """
+		return self.fleet._add_timer(t, self._fire_timer, (t, f, args))
+	
+	def _cancel_timer_callback(self, handle):
+		""" Implement the cancellation of timer callback """
+		return self.fleet.timer_cb.cancel(handle)
+	
+	def _timer_callback_time(self, handle):
+		""" Implement the time of timer callback """
+		return handle.t
+	
+	def _fire_timer(self, t, f, args):
+		if self.profiler is not None:
+			self.profiler.timer_lag(self.current_time() - t)
+		if self.recorder is not None:
+			self.recorder.timer_fired(self.current_time(), t)
+		f(*args)
+	
+	def _schedule(self, task):
+		super(FleetScheduler, self)._schedule(task)
+		self._request_step()
+	
+	def _schedule_now(self, task):
+		super(FleetScheduler, self)._schedule_now(task)
+		self._request_step()
+	
+	def _request_step(self):
+		""" Put this scheduler in the ready list of the fleet, if it has ready tasks """
+		if not self.fleet_queued and self.ready:
+			self.fleet_queued = True
+			self.fleet.ready.append(self)
+	
+	def _wakeup(self):
+		""" Let the fleet process the inbox, can be called from any thread """
+		self.fleet.call_soon_threadsafe(self)
+	
+class Fleet(object):
+	""" Many FleetScheduler run by a single thread, sharing one timer queue and one ready list.
+	
+	Instead of one thread sleeping per scheduler, the fleet sleeps until its
+	earliest timer, and only steps the schedulers with ready tasks, each for
+	at most max_slices slices at a time, if given, so that a busy scheduler
+	does not delay the others.
+	"""
+	
+	def __init__(self, timer_queue=None, max_slices=None):
+		""" Initialize """
+		if timer_queue is None:
+			timer_queue = HeapTimerQueue()
+		# Timers of all schedulers
+		self.timer_cb = timer_queue
+		# Deque of schedulers with ready tasks
+		self.ready = deque()
+		# All schedulers of the fleet
+		self.schedulers = []
+		self.max_slices = max_slices
+		# Deque of schedulers to step, appended to by other threads
+		self.inbox = deque()
+		# Wakes _sleep() up from other threads, released by close()
+		self.wakeup_pipe = WakeupPipe()
+	
+	# Public API, these functions are safe to be called from within a task or from outside
+	
+	def current_time(self):
+		""" Return the current time """
+		return time.time()
+	
+	def call_soon_threadsafe(self, sched):
+		""" Step scheduler sched as soon as possible, for instance to process its inbox, can be called from any thread """
+		self.inbox.append(sched)
+		self._wakeup()
+	
+	def close(self):
+		""" Release the pipe used to wake the fleet up from other threads, it is created again if needed """
+		self.wakeup_pipe.close()
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+	
+	# Public API, these funtions must be called outside a task
+	
+	def run(self):
+		""" Run until no scheduler has a task to schedule """
+		while True:
+			self.step()
+			t = self.timer_cb.next_time()
+			if t is None:
+				if not self._waiting():
+					return
+				# only other threads can change conditions or complete futures now
+				self._sleep(None)
+				continue
+			duration = t - self.current_time()
+			if duration >= 0:
+				self._sleep(duration)
+			self.timer_step()
+	
+	def timer_step(self):
+		""" Fire all timers with past deadlines and step the schedulers that became ready, return the number of slices run """
+		now = self.current_time()
+		for timer in self.timer_cb.pop_due(now):
+			timer.f(*timer.args)
+		return self.step()
+	
+	def step(self):
+		""" Step the schedulers with ready tasks until none has any, return the number of slices run """
+		inbox = self.inbox
+		ready = self.ready
+		max_slices = self.max_slices
+		slices = 0
+		while True:
+			while inbox:
+				sched = inbox.popleft()
+				if not sched.fleet_queued:
+					sched.fleet_queued = True
+					ready.append(sched)
+			if not ready:
+				return slices
+			sched = ready.popleft()
+			try:
+				slices += sched.step(max_slices)
+			finally:
+				# even if a task raised, so that the scheduler is stepped again
+				if sched.ready:
+					# budget exhausted, step it again after the others
+					ready.append(sched)
+				else:
+					sched.fleet_queued = False
+	
+	# Protected implementations, these functions can only be called by functions from this object
+	
+	def _add_timer(self, t, f, args):
+		""" Add a timer calling f(*args) at time t, return it """
+		if not self.timer_cb:
+			# let an empty queue catch up with the current time
+			self.timer_cb.pop_due(self.current_time())
+		return self.timer_cb.add(t, f, args)
+	
+	def _waiting(self):
+		""" Return whether a scheduler waits for other threads """
+		for sched in self.schedulers:
+			if sched.cond_waiting or sched.threshold_indexes or sched.pending_futures or sched.inbox:
+				return True
+		return bool(self.inbox)
+	
+	def _sleep(self, duration):
+		""" Sleep a certain amount of time, forever if None, or until woken up by another thread """
+		if not self.inbox:
+			self.wakeup_pipe.sleep(duration)
+	
+	def _wakeup(self):
+		""" Wake _sleep() up, can be called from any thread """
+		self.wakeup_pipe.wake_up()
 	
 # ------------------------------------------------------------
 #                   === Helper objects ===
@@ -413,6 +2790,7 @@ class TimerScheduler(Scheduler):
 
 class Rate(object):
 	""" Helper class to execute a loop at a certain rate """
+	__slots__ = ('duration', 'last_time')
 	def __init__(self,duration,initial_time):
 		""" Initialize """
 		self.duration = duration
@@ -427,30 +2805,140 @@ class Rate(object):
 			sched._schedule(task)
 		return delta_time
 
+class BatchUpdate(object):
+	""" Helper class collecting the changes of condition variables, see Scheduler.batch_update() """
+	def __init__(self,sched):
+		""" Initialize """
+		self.sched = sched
+		self.depth = 0
+		self.dirty = []          # names of changed variables having waiting conditions
+		self.dirty_set = set()
+		self.deferred = 0        # evaluations that immediate updates would have done
+		self.evaluations = 0     # evaluations done when leaving the outermost context
+		self.saved = 0           # difference between these two
+	def __enter__(self):
+		self.depth += 1
+		self.sched.batch = self
+		return self
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.depth -= 1
+		if self.depth == 0:
+			self.sched._commit_batch(self)
+		return False
+	def _defer(self, name, waiting_count):
+		""" Record that variable name changed while waiting_count conditions depend on it """
+		if name not in self.dirty_set:
+			self.dirty_set.add(name)
+			self.dirty.append(name)
+		self.deferred += waiting_count
+
+# ------------------------------------------------------------
+#                       === Channels ===
+# ------------------------------------------------------------
+
+class Channel(object):
+	""" A bounded queue of messages between the tasks of a scheduler, see Scheduler.new_channel(), Send and Recv.
+	
+	Up to capacity messages are kept, with a capacity of 0 a sender waits
+	for a receiver to take its message. Blocked senders and receivers are
+	parked on the channel and woken in order by the operation unblocking
+	them, without evaluating conditions. Unlike a condition variable, no
+	message is lost.
+	"""
+	def __init__(self, sched, capacity=1):
+		""" Initialize """
+		self.sched = sched
+		self.capacity = capacity
+		self.messages = deque()     # messages sent and not received yet
+		self.senders = deque()      # parked (task, message)
+		self.receivers = deque()    # parked tasks
+	def __len__(self):
+		""" Return the number of messages waiting to be received """
+		return len(self.messages)
+	def _remove(self, task):
+		""" Unpark task, killed while waiting """
+		self.senders = deque(entry for entry in self.senders if entry[0] is not task)
+		if task in self.receivers:
+			self.receivers.remove(task)
+
+class RingBufferChannel(Channel):
+	""" A channel of fixed-size slots in one preallocated buffer, see Scheduler.new_ring_buffer_channel().
+	
+	Large payloads are not copied nor allocated per message: a sender waits
+	for a free slot with Reserve, fills the memoryview it gets and sends it,
+	the receiver gets the same memoryview and calls release() when done
+	with it. A slot reserved or received by a task that is killed is only
+	reused if released.
+	"""
+	def __init__(self, sched, slots, slot_size):
+		""" Initialize """
+		super(RingBufferChannel, self).__init__(sched, slots)
+		self.slot_size = slot_size
+		self.buffer = bytearray(slots * slot_size)
+		view = memoryview(self.buffer)
+		self.free = deque(view[i * slot_size:(i + 1) * slot_size] for i in xrange(slots))
+		self.reservers = deque()    # parked tasks waiting for a free slot
+		self.reserved = set()       # identifiers of the slots reserved and not released yet
+	def release(self, slot):
+		""" Give back a received slot, to be reserved again """
+		if id(slot) not in self.reserved:
+			raise ValueError('slot not reserved from this channel or already released')
+		if self.reservers:
+			task = self.reservers.popleft()
+			task.channel = None
+			task.sendval = slot
+			self.sched._schedule(task)
+		else:
+			self.reserved.remove(id(slot))
+			self.free.append(slot)
+	def _remove(self, task):
+		super(RingBufferChannel, self)._remove(task)
+		if task in self.reservers:
+			self.reservers.remove(task)
+
 # ------------------------------------------------------------
 #                   === System Calls ===
 # ------------------------------------------------------------
 
 class SystemCall(object):
 	""" Parent of all system calls """
+	__slots__ = ('task', 'sched')
 	def handle(self):
 		""" Called in the scheduler context """
 		raise NotImplementedError('system call superclass should not be used directly')
+	def _dispatch(self, sched, task):
+		""" Called by sched when task yields this system call """
+		self.task = task
+		self.sched = sched
+		self.handle()
 
 class Pass(SystemCall):
-	""" Pass the execution to other tasks """
+	""" Pass the execution to other tasks, use the shared PASS instead of creating one each time """
+	__slots__ = ()
 	def handle(self):
 		self.task.sendval = True
 		self.sched._schedule(self.task)
-	
+
+class _SharedPass(Pass):
+	""" The class of PASS, a Pass that can be shared between schedulers """
+	__slots__ = ()
+	def _dispatch(self, sched, task):
+		# without storing task and sched, subclasses of Pass keep going through handle()
+		task.sendval = True
+		sched._schedule(task)
+
+PASS = _SharedPass()
+
 class GetScheduler(SystemCall):
 	""" Return the scheduler, useful to access condition variables """
+	__slots__ = ()
 	def handle(self):
 		self.task.sendval = self.sched
 		self.sched._schedule(self.task)
 
 class WaitTask(SystemCall):
 	""" Wait for a task to exit, return whether the wait was a success """
+	__slots__ = ('tid',)
 	def __init__(self,tid):
 		self.tid = tid
 	def handle(self):
@@ -464,6 +2952,7 @@ class WaitTask(SystemCall):
 
 class WaitAnyTasks(SystemCall):
 	""" Wait for any tasks to exit, return whether the wait was a success """
+	__slots__ = ('tids',)
 	def __init__(self,tids):
 		self.tids = tids
 	def handle(self):
@@ -490,6 +2979,7 @@ class WaitAnyTasks(SystemCall):
 
 class WaitAllTasks(SystemCall):
 	""" Wait for all tasks to exit, return whether the wait was a success """
+	__slots__ = ('tids',)
 	def __init__(self,tids):
 		self.tids = tids
 	def handle(self):
@@ -508,6 +2998,7 @@ class WaitAllTasks(SystemCall):
 
 class WaitDuration(SystemCall):
 	""" Pause current task for a certain duration """
+	__slots__ = ('duration',)
 	def __init__(self,duration):
 		self.duration = duration
 	def handle(self):
@@ -516,14 +3007,80 @@ class WaitDuration(SystemCall):
 
 class WaitCondition(SystemCall):
 	""" Pause current task until the condition is true """
+	__slots__ = ('condition',)
 	def __init__(self,condition):
 		self.condition = condition
 	def handle(self):
 		self.sched._wait_condition(self.task,self.condition)
 		self.task.sendval = None
 
+class WaitFuture(SystemCall):
+	""" Pause current task until a future is done, return its result or raise its exception """
+	__slots__ = ('future',)
+	def __init__(self,future):
+		self.future = future
+	def handle(self):
+		self.task.sendval = None
+		self.sched._wait_future(self.task,self.future)
+
+class RunInPool(SystemCall):
+	""" Pause current task until fn(*args) has run in a pool of processes, return its result or raise its exception.
+	
+	fn, args and the result must be picklable. The pool is the process_pool
+	of the scheduler, by default with one process per core.
+	"""
+	__slots__ = ('fn', 'args')
+	def __init__(self,fn,*args):
+		self.fn = fn
+		self.args = args
+	def handle(self):
+		self.task.sendval = None
+		self.sched._run_in_executor(self.task,self.sched._get_process_pool(),self.fn,self.args)
+
+class RunInThread(SystemCall):
+	""" Pause current task until fn(*args) has run in a pool of threads, return its result or raise its exception.
+	
+	This is meant for blocking calls. The pool is the thread_pool of the
+	scheduler, by default with thread_pool_workers threads. Killing the task
+	cancels the call if it has not started yet.
+	"""
+	__slots__ = ('fn', 'args')
+	def __init__(self,fn,*args):
+		self.fn = fn
+		self.args = args
+	def handle(self):
+		self.task.sendval = None
+		self.sched._run_in_executor(self.task,self.sched._get_thread_pool(),self.fn,self.args)
+
+class Send(SystemCall):
+	""" Send a message on a channel, pausing current task while the channel is full """
+	__slots__ = ('channel', 'message')
+	def __init__(self,channel,message):
+		self.channel = channel
+		self.message = message
+	def handle(self):
+		self.task.sendval = None
+		self.sched._send(self.task,self.channel,self.message)
+
+class Recv(SystemCall):
+	""" Pause current task until a message is available on a channel, return it """
+	__slots__ = ('channel',)
+	def __init__(self,channel):
+		self.channel = channel
+	def handle(self):
+		self.sched._recv(self.task,self.channel)
+
+class Reserve(SystemCall):
+	""" Pause current task until a slot of a RingBufferChannel is free, return it as a memoryview to fill and send """
+	__slots__ = ('channel',)
+	def __init__(self,channel):
+		self.channel = channel
+	def handle(self):
+		self.sched._reserve(self.task,self.channel)
+
 class Sleep(SystemCall):
 	""" Sleep using a rate object """
+	__slots__ = ('rate',)
 	def __init__(self,rate):
 		self.rate = rate
 	def handle(self):
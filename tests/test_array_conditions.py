@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class FleetSimulator(Scheduler):
+	battery = ArrayConditionVariable(6, 100.)
+	mode = ConditionVariable('explore')
+
+def agent(i):
+	yield WaitCondition(Var('battery')[i] < 10)
+	sched.printd('agent %d low with battery %.0f' % (i, sched.battery[i]))
+
+def leader():
+	predicate = (Var('battery')[0] <= 50) & (Var('mode') == 'return')
+	sched.printd('leader waits for %r' % predicate)
+	yield WaitCondition(predicate)
+	sched.printd('leader returns with battery %.0f' % sched.battery[0])
+
+def charger():
+	yield WaitCondition(Var('battery')[5] == 100)
+	sched.printd('agent 5 charged')
+
+sched = FleetSimulator()
+other = FleetSimulator()
+tids = [sched.new_task(agent(i)) for i in xrange(6)]
+sched.new_task(leader())
+sched.step()
+print 'arrays per scheduler:', sched.battery is not other.battery
+
+print '* Discharge *'
+drain = [30., 10., 25., 5., 40., 60.]
+for step in xrange(4):
+	battery = sched.battery - drain
+	print 'battery:', ' '.join('%.0f' % value for value in battery)
+	sched.battery = battery
+	sched.step()
+	if step == 1:
+		print 'killing agent 4'
+		sched.kill_task(tids[4])
+print 'mode=return'
+sched.mode = 'return'
+sched.step()
+
+print '* In place *'
+sched.new_task(charger())
+sched.step()
+sched.battery[5] = 100.
+sched.step()
+print 'not woken by in place changes, assigning again'
+sched.battery = sched.battery
+sched.step()
+print 'tasks left:', len(sched.taskmap), 'indexes left:', len(sched.threshold_indexes), 'entries:', len(sched.threshold_indexes['battery'])
+
+print '* Errors *'
+try:
+	Var('battery')[0][1] < 3
+except TypeError as e:
+	print 'TypeError:', e
+
+print '* Two dimensions *'
+class GridSimulator(SimulatedTimeScheduler):
+	occupancy = ArrayConditionVariable((3, 4))
+def watch_cell(name, predicate):
+	yield WaitCondition(predicate)
+	sched.printd('%s reached' % name)
+sched = GridSimulator()
+sched.new_task(watch_cell('cell 1, 2', Var('occupancy')[1, 2] > 0.5))
+sched.new_task(watch_cell('last row, first cell', Var('occupancy')[-1, 0] > 0.5))
+sched.new_task(watch_cell('cell 0, 3', Var('occupancy')[0, 3] >= 0.5))
+sched.step()
+for row, col in [(1, 2), (0, 0), (2, 0)]:
+	occupancy = sched.occupancy.copy()
+	occupancy[row, col] = 1.
+	print 'occupied:', row, col
+	sched.occupancy = occupancy
+	sched.step()
+print 'entries left:', len(sched.threshold_indexes['occupancy'])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class RobotScheduler(AsyncioScheduler):
+	pass
+
+def failing_call(sched):
+	future = sched.asyncio.Future(loop=sched.loop)
+	sched.loop.call_later(0.01, future.set_exception, ValueError('sensor unplugged'))
+	return future
+
+def reader(sched):
+	sched.printd('reading')
+	yield WaitFuture(failing_call(sched))
+	sched.printd('never printed')
+
+def counter(sched, count):
+	for i in xrange(count):
+		sched.printd('count %d' % i)
+		yield WaitDuration(0.01)
+
+print '* Exception escaping a task *'
+sched = RobotScheduler()
+sched.new_task(reader(sched))
+try:
+	sched.run()
+except ValueError as e:
+	print 'ValueError:', e
+print 'current task cleared:', sched.current_task is None, 'tasks left:', len(sched.taskmap)
+sched.new_task(counter(sched, 2))
+sched.run()
+
+print '* Resuming while idle *'
+def resume_later(sched, tid):
+	yield WaitDuration(0.05)
+	sched.printd('resuming %d' % tid)
+	sched.resume_task(tid)
+sched = RobotScheduler()
+tid = sched.new_task(counter(sched, 3))
+sched.pause_task(tid)
+sched.new_task(resume_later(sched, tid))
+sched.run()
+
+print '* Killing a sleeping task *'
+def sleep_long(sched):
+	yield WaitDuration(3600)
+def kill_later(sched, tid):
+	yield WaitDuration(0.05)
+	sched.printd('killing %d' % tid)
+	sched.kill_task(tid)
+sched = RobotScheduler()
+sched.new_task(kill_later(sched, sched.new_task(sleep_long(sched))))
+start_time = time.time()
+sched.run()
+print 'timer cancelled:', time.time() - start_time < 1.
+
+print '* Resuming a group while idle *'
+def resume_group_later(sched, group):
+	yield WaitDuration(0.05)
+	sched.printd('resuming %s' % group.name)
+	sched.resume_group(group)
+sched = RobotScheduler()
+group = sched.new_group('counters')
+sched.new_task(counter(sched, 2), group=group)
+sched.pause_group(group)
+sched.new_task(resume_group_later(sched, group))
+sched.run()
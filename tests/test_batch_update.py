@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class RobotScheduler(TimerScheduler):
+	x = ConditionVariable(0.)
+	y = ConditionVariable(0.)
+	z = ConditionVariable(0.)
+
+evaluations = [0]
+
+def at_target(sched):
+	evaluations[0] += 1
+	return sched.x == 1 and sched.y == 2 and sched.z == 3
+
+def navigator(sched, name):
+	yield WaitCondition(lambda: at_target(sched))
+	print name, 'at target'
+
+def run(update):
+	sched = RobotScheduler()
+	sched.log_sink = None
+	for name in ['first', 'second']:
+		sched.new_task(navigator(sched, name))
+	sched.step()
+	evaluations[0] = 0
+	saved = update(sched)
+	print 'evaluations:', evaluations[0], 'saved:', saved
+	sched.step()
+
+print '* One variable at a time *'
+def set_each(sched):
+	sched.x = 1
+	sched.y = 2
+	sched.z = 3
+run(set_each)
+
+print '* set_many *'
+run(lambda sched: sched.set_many({'x': 1, 'y': 2, 'z': 3}))
+
+print '* batch_update *'
+def set_in_batch(sched):
+	with sched.batch_update() as batch:
+		sched.x = 1
+		sched.y = 2
+		sched.z = 3
+		print 'evaluations in batch:', evaluations[0]
+	return batch.saved
+run(set_in_batch)
+
+print '* Nested set_many *'
+def set_nested(sched):
+	with sched.batch_update() as batch:
+		print 'nested set_many returns:', sched.set_many({'x': 1, 'y': 2})
+		print 'nested set_many returns:', sched.set_many({'z': 3})
+		print 'evaluations in batch:', evaluations[0]
+	return batch.saved
+run(set_nested)
+
+print '* Unknown variable *'
+sched = RobotScheduler()
+try:
+	sched.set_many({'w': 1})
+except AttributeError as e:
+	print 'AttributeError:', e
+print 'batch left:', sched.batch
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+def producer(channel, count):
+	for i in xrange(count):
+		sched.printd('sending %d' % i)
+		yield Send(channel, i)
+	sched.printd('all sent')
+
+def consumer(channel, count):
+	for i in xrange(count):
+		message = yield Recv(channel)
+		sched.printd('received %d, %d left in channel' % (message, len(channel)))
+		yield WaitDuration(0.1)
+
+def camera(channel, count):
+	for i in xrange(count):
+		frame = yield Reserve(channel)
+		frame[:] = chr(ord('a') + i) * len(frame)
+		sched.printd('captured frame %d at %.1f' % (i, sched.current_time()))
+		yield Send(channel, frame)
+
+def viewer(channel, count, slots):
+	for i in xrange(count):
+		frame = yield Recv(channel)
+		sched.printd('showing %s at %.1f' % (frame.tobytes(), sched.current_time()))
+		slots.add(id(frame))
+		yield WaitDuration(0.1)
+		channel.release(frame)
+
+sched = SimulatedTimeScheduler()
+
+print '* Capacity 2 *'
+channel = sched.new_channel(2)
+sched.new_task(producer(channel, 5))
+sched.new_task(consumer(channel, 5))
+sched.run()
+
+print '* Capacity 0 *'
+channel = sched.new_channel(0)
+sched.new_task(producer(channel, 3))
+sched.new_task(consumer(channel, 3))
+sched.run()
+
+print '* Killing parked tasks *'
+channel = sched.new_channel(1)
+receiver_tid = sched.new_task(consumer(channel, 1))
+sched.step()
+killed = sched.kill_task(receiver_tid)
+print 'killed receiver:', killed, 'receivers left:', len(channel.receivers)
+sender_tid = sched.new_task(producer(channel, 3))
+sched.step()
+killed = sched.kill_task(sender_tid)
+print 'killed sender:', killed, 'senders left:', len(channel.senders), 'messages:', list(channel.messages)
+
+print '* Ring buffer *'
+channel = sched.new_ring_buffer_channel(2, 4)
+slots = set()
+sched.new_task(camera(channel, 5))
+sched.new_task(viewer(channel, 5, slots))
+sched.run()
+print 'slots used:', len(slots), 'free:', len(channel.free)
+
+print '* Errors *'
+other = SimulatedTimeScheduler()
+def foreign(channel, syscall):
+	try:
+		yield syscall(channel)
+	except ValueError as e:
+		sched.printd('ValueError: %s' % e)
+sched.new_task(foreign(other.new_channel(1), lambda channel: Send(channel, 0)))
+sched.new_task(foreign(other.new_channel(1), Recv))
+sched.new_task(foreign(other.new_ring_buffer_channel(1, 4), Reserve))
+sched.run()
+assert not sched.taskmap, sched.taskmap
+def release_twice(channel):
+	slot = yield Reserve(channel)
+	channel.release(slot)
+	try:
+		channel.release(slot)
+		assert False, 'releasing a slot twice should fail'
+	except ValueError as e:
+		sched.printd('ValueError: %s' % e)
+	try:
+		channel.release(memoryview(bytearray(4)))
+		assert False, 'releasing a foreign slot should fail'
+	except ValueError as e:
+		sched.printd('ValueError: %s' % e)
+channel = sched.new_ring_buffer_channel(2, 4)
+sched.new_task(release_twice(channel))
+sched.run()
+assert len(channel.free) == 2 and len(set(map(id, channel.free))) == 2
+assert not channel.reserved
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import threading
+sys.path.append('..')
+from teer import *
+
+class Robot(FleetScheduler):
+	battery = ConditionVariable(100)
+	def __init__(self, fleet, name):
+		super(Robot, self).__init__(fleet)
+		self.name = name
+		self.log_sink = None
+
+def patrol(robot, period, count):
+	for i in xrange(count):
+		yield WaitDuration(period)
+		robot.battery -= 20
+		print '%s patrols, battery %d' % (robot.name, robot.battery)
+
+def monitor(robot):
+	yield WaitCondition(lambda: robot.battery < 50)
+	print '%s battery low, %d tasks' % (robot.name, len(robot.taskmap))
+
+def charger(robot):
+	yield WaitCondition(lambda: robot.battery > 100)
+	print '%s charged to %d' % (robot.name, robot.battery)
+
+fleet = Fleet()
+robots = [Robot(fleet, 'robot %d' % i) for i in xrange(3)]
+for robot, period in zip(robots, [0.02, 0.035, 0.055]):
+	robot.new_task(patrol(robot, period, 3))
+	robot.new_task(monitor(robot))
+print 'Running fleet'
+fleet.run()
+print 'batteries:', [robot.battery for robot in robots]
+
+# only another thread can wake the fleet up
+robot = robots[0]
+robot.new_task(charger(robot))
+fleet.step()
+threading.Timer(0.05, robot.set_threadsafe, ('battery', 120)).start()
+print 'Waiting for charge'
+fleet.run()
+print 'All robots are idle'
+
+# a task raising does not stop its scheduler from being stepped
+def faulty(robot):
+	yield WaitDuration(0.01)
+	raise RuntimeError('%s is faulty' % robot.name)
+robot = robots[1]
+robot.profiler = Profiler()
+robot.new_task(faulty(robot))
+robot.new_task(patrol(robot, 0.01, 2))
+try:
+	fleet.run()
+except RuntimeError as e:
+	print 'RuntimeError:', e
+fleet.run()
+assert not robot.taskmap and not robot.fleet_queued
+# the timers of the scheduler are profiled
+stats = robot.profiler.snapshot()
+assert stats['timers'] == 3, stats['timers']
+print 'All robots are idle again'
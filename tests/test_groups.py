@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+def worker(name, count):
+	for i in xrange(count):
+		sched.printd('%s %d at %.2f' % (name, i, sched.current_time()))
+		yield WaitDuration(0.1)
+
+def sleeper():
+	yield WaitDuration(3600)
+
+def print_stats(group):
+	print ', '.join('%s: %s' % item for item in sorted(group.stats().items()))
+
+def mission():
+	sched.printd('Exploring')
+	yield WaitDuration(0.25)
+	sched.printd('Pausing exploration')
+	sched.pause_group(explore)
+	yield WaitDuration(0.3)
+	print_stats(explore)
+	sched.printd('Resuming exploration')
+	sched.resume_group(explore)
+	yield WaitDuration(0.25)
+	sched.printd('Killing exploration')
+	killed = sched.kill_group(explore)
+	print 'killed:', sorted(killed)
+	print_stats(explore)
+	print 'tasks left:', len(sched.taskmap)
+
+sched = SimulatedTimeScheduler()
+explore = sched.new_group('explore')
+navigation = sched.new_group('navigation', explore)
+sched.new_task(worker('camera', 10), group=explore)
+sched.new_task(worker('wheels', 10), group=navigation)
+sched.new_task(sleeper(), group=navigation)
+sched.new_task(mission())
+sched.run()
+
+print '* Killed and emptied groups are detached *'
+print 'navigation attached:', navigation.attached, 'children of explore:', explore.children
+def step(name):
+	yield WaitDuration(0.1)
+patrol = sched.new_group('patrol')
+log_sink = sched.log_sink
+sched.log_sink = None
+for i in xrange(1000):
+	sched.new_task(step('leg %d' % i), group=sched.new_group('leg %d' % i, patrol))
+print 'children of patrol while running:', len(patrol.children)
+sched.run()
+sched.log_sink = log_sink
+print 'children of patrol after the run:', len(patrol.children)
+print_stats(patrol)
+print '* Reused group is attached again *'
+sched.new_task(worker('wheels', 1), group=navigation)
+print 'navigation attached:', navigation.attached, 'children of explore:', explore.children
+sched.run()
+print_stats(explore)
+print_stats(navigation)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Start and kill a million tasks waiting on timers, conditions and other
+# tasks, and check that the memory used by the scheduler stays flat.
+
+import sys
+sys.path.append('..')
+from teer import *
+import gc
+
+class MyScheduler(TimerScheduler):
+	level = ConditionVariable(0)
+
+def sleeper():
+	yield WaitDuration(3600)
+
+def watcher():
+	yield WaitCondition(lambda: sched.level > 10)
+
+def supervisor(tids):
+	yield WaitAllTasks(tids)
+
+def scheduler_size():
+	""" Return the number of entries in the structures of the scheduler """
+	return len(sched.taskmap) + len(sched.ready) + len(sched.exit_waiting) + \
+		len(sched.exit_waited) + len(sched.cond_waiting) + len(sched.timer_cb.heap)
+
+sched = MyScheduler()
+sched.log_sink = None
+total_tasks = 1000000
+batch_size = 1000
+object_counts = []
+print 'Starting and killing %d tasks' % total_tasks
+for batch in xrange(total_tasks / batch_size):
+	tids = []
+	for i in xrange(batch_size / 4):
+		tids.append(sched.new_task(sleeper()))
+		tids.append(sched.new_task(watcher()))
+		tids.append(sched.new_task(sleeper()))
+		tids.append(sched.new_task(supervisor(tids[-3:])))
+	sched.step()
+	# kill half of the tasks while running, the other half while paused
+	sched.pause_tasks(tids[::2])
+	killed = sched.kill_tasks(tids)
+	assert len(killed) == len(tids)
+	# skip the entries of killed tasks in the ready queue
+	sched.step()
+	# the heap of timers might keep some cancelled timers
+	assert scheduler_size() <= 64, scheduler_size()
+	if batch % 100 == 99:
+		gc.collect()
+		object_counts.append(len(gc.get_objects()))
+		print '%d tasks killed, %d objects alive' % ((batch + 1) * batch_size, object_counts[-1])
+assert not sched.taskmap and not sched.ready and not sched.cond_waiting
+assert max(object_counts) - object_counts[0] < 100, object_counts
+print 'Memory is flat'
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+from StringIO import StringIO
+import re
+
+class RobotScheduler(SimulatedTimeScheduler):
+	pass
+
+def worker(sched, sleep_time):
+	sched.printd('working')
+	time.sleep(sleep_time)
+	yield WaitDuration(1)
+
+def run(log_sink, sleep_time=0.):
+	sched = RobotScheduler()
+	sched.log_sink = log_sink
+	sched.overrun_duration = 0.005
+	sched.new_task(worker(sched, sleep_time))
+	sched.run()
+
+def show(text):
+	# strip the wall-clock times and durations
+	for line in text.splitlines():
+		print '  ' + re.sub('[0-9.]+ ms', 'X ms', line.split(' - ', 1)[1])
+
+print '* Stream *'
+stream = StringIO()
+run(StreamLogSink(stream))
+show(stream.getvalue())
+
+print '* Stream at warning level *'
+stream = StringIO()
+run(StreamLogSink(stream, level=LogSink.WARNING), 0.02)
+show(stream.getvalue())
+
+print '* Threaded stream *'
+stream = StringIO()
+sink = StreamLogSink(stream, threaded=True)
+run(sink)
+sink.flush()
+show(stream.getvalue())
+
+print '* Ring buffer keeping the last 2 events *'
+sink = RingBufferLogSink(capacity=2)
+run(sink)
+show('\n'.join(sink.messages()))
+
+print '* Ring buffer at error level *'
+sink = RingBufferLogSink(level=LogSink.ERROR)
+run(sink, 0.02)
+print '  events:', len(sink.messages())
+
+print '* Disabled *'
+run(None)
+print '  nothing logged'
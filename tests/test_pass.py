@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Check that the shared PASS works in several schedulers, and that
+# subclasses of Pass go through their own handle().
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class CountingPass(Pass):
+	""" A Pass counting how many times it was handled """
+	__slots__ = ()
+	count = 0
+	def handle(self):
+		CountingPass.count += 1
+		super(CountingPass, self).handle()
+
+def yielder(name, syscall, count):
+	for i in xrange(count):
+		result = yield syscall
+		assert result is True, result
+	print name, 'passed', count, 'times'
+
+first = Scheduler()
+second = Scheduler()
+first.log_sink = None
+second.log_sink = None
+first.new_task(yielder('shared in first', PASS, 3))
+second.new_task(yielder('shared in second', PASS, 3))
+first.new_task(yielder('instance', Pass(), 3))
+first.new_task(yielder('subclass', CountingPass(), 4))
+first.step()
+second.step()
+assert not first.taskmap and not second.taskmap
+assert CountingPass.count == 4, CountingPass.count
+print 'subclass handled', CountingPass.count, 'times'
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class RobotScheduler(Scheduler):
+	energy_level = ConditionVariable(100)
+	chlorophyll_level = ConditionVariable(0.)
+	mode = ConditionVariable('explore')
+
+def monitor(name, predicate):
+	sched.printd('%s waits for %r' % (name, predicate))
+	yield WaitCondition(predicate)
+	sched.printd('%s woken with energy_level=%d, chlorophyll_level=%.1f, mode=%s' %
+		(name, sched.energy_level, sched.chlorophyll_level, sched.mode))
+
+sched = RobotScheduler()
+sched.new_task(monitor('low energy', Var('energy_level') < 10))
+sched.new_task(monitor('green', (Var('chlorophyll_level') >= 3) & (Var('energy_level') > 50)))
+sched.new_task(monitor('lunch', (Var('mode') == 'lunch') | (Var('energy_level') <= 5)))
+sched.new_task(monitor('not exploring', Var('mode') != 'explore'))
+sched.step()
+
+print '* Sensor updates *'
+for energy_level, chlorophyll_level in [(90, 1.), (60, 2.), (40, 3.), (60, 3.5), (30, 2.), (8, 1.)]:
+	print 'energy_level=%d, chlorophyll_level=%.1f' % (energy_level, chlorophyll_level)
+	with sched.batch_update():
+		sched.energy_level = energy_level
+		sched.chlorophyll_level = chlorophyll_level
+	sched.step()
+print 'mode=lunch'
+sched.mode = 'lunch'
+sched.step()
+print 'tasks left:', len(sched.taskmap), 'indexes left:', len(sched.threshold_indexes)
+
+print '* Errors *'
+try:
+	Var('energy_level') < Var('chlorophyll_level')
+except TypeError as e:
+	print 'TypeError:', e
+def unknown():
+	try:
+		yield WaitCondition(Var('temperature') > 50)
+	except AttributeError as e:
+		print 'AttributeError in the task:', e
+def unknown_uncaught():
+	yield WaitCondition(Var('temperature') > 50)
+sched.new_task(unknown())
+sched.step()
+sched.new_task(unknown_uncaught())
+try:
+	sched.step()
+except AttributeError as e:
+	print 'AttributeError:', e
+assert not sched.taskmap, sched.taskmap
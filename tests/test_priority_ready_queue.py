@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Check the order in which PriorityReadyQueue gives ready tasks: levels by
+# decreasing priority, tasks with a deadline first within a level, and
+# tasks resumed at once ahead of their level only.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class Entry(object):
+	""" The attributes of a task used by the ready queue """
+	def __init__(self, name, priority=0, deadline=None):
+		self.name = name
+		self.priority = priority
+		self.deadline = deadline
+	def __repr__(self):
+		return self.name
+
+def names(queue):
+	""" Pop all entries of queue, return their names """
+	popped = []
+	while queue:
+		popped.append(queue.popleft().name)
+	return popped
+
+# the queue alone, with a clock advancing between insertions
+now = [0.]
+def clock():
+	return now[0]
+
+queue = PriorityReadyQueue(clock)
+queue.append(Entry('low', -1))
+queue.append(Entry('fifo1'))
+queue.append(Entry('late', deadline=0.5))
+now[0] = 1.
+# absolute deadline 1.2, after the one of late at 0.5 although relative deadline is shorter
+queue.append(Entry('early', deadline=0.2))
+queue.append(Entry('fifo2'))
+queue.appendleft(Entry('now'))
+queue.append(Entry('high', 2))
+assert len(queue) == 7
+assert [entry.name for entry in queue] == ['high', 'late', 'early', 'now', 'fifo1', 'fifo2', 'low']
+popped = names(queue)
+print 'queue order:', ', '.join(popped)
+assert popped == ['high', 'late', 'early', 'now', 'fifo1', 'fifo2', 'low']
+assert len(queue) == 0
+try:
+	queue.popleft()
+	assert False, 'popping an empty queue should fail'
+except IndexError:
+	pass
+
+# equal deadlines are taken in the order they were queued
+queue = PriorityReadyQueue(clock, [Entry('d%d' % i, deadline=1.) for i in xrange(5)])
+assert names(queue) == ['d0', 'd1', 'd2', 'd3', 'd4']
+
+# in a scheduler
+sched = Scheduler()
+sched.log_sink = None
+trace = []
+
+def worker(name):
+	trace.append(name)
+	yield PASS
+	trace.append(name + ' again')
+
+def sender(channel):
+	trace.append('sender')
+	sched.new_task(worker('urgent'), priority=1)
+	# a message fits in the channel, sender is resumed at once, but after the higher level
+	yield Send(channel, 1)
+	trace.append('sender resumed')
+
+# with plain tasks queued, including a paused and a killed one, before the conversion
+sched.new_task(worker('a'))
+paused = sched.new_task(worker('paused'))
+killed = sched.new_task(worker('killed'))
+sched.pause_task(paused)
+sched.kill_task(killed)
+assert type(sched.ready) is deque
+sched.new_task(sender(sched.new_channel(1)))
+sched.new_task(worker('deadline'), deadline=0.1)
+sched.new_task(worker('background'), priority=-1)
+assert isinstance(sched.ready, PriorityReadyQueue)
+sched.step()
+print 'scheduler order:', ', '.join(trace)
+assert trace == [
+	# a task with a deadline goes back ahead of the tasks without, sender resumed ahead of a
+	'deadline', 'deadline again', 'a', 'sender', 'urgent', 'urgent again', 'sender resumed', 'a again',
+	'background', 'background again'
+]
+assert paused in sched.taskmap and killed not in sched.taskmap
+
+# the paused task keeps its level when resumed
+del trace[:]
+sched.resume_task(paused)
+sched.new_task(worker('b'), priority=-1)
+sched.step()
+assert trace == ['paused', 'paused again', 'b', 'b again']
+assert not sched.ready and not sched.taskmap
+print 'paused task resumed in its level'
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+class RobotScheduler(SimulatedTimeScheduler):
+	battery = ConditionVariable(100.)
+
+def spin(duration):
+	end_time = time.clock() + duration
+	while time.clock() < end_time:
+		pass
+
+def planner(sched):
+	# 3 slices of 20 ms of processor time, then the exit slice
+	for i in xrange(3):
+		spin(0.02)
+		sched.battery -= 30
+		yield WaitDuration(1)
+
+def camera(sched):
+	# 2 slices of 20 ms of waiting, then the exit slice
+	for i in xrange(2):
+		time.sleep(0.02)
+		yield WaitDuration(1)
+
+def monitor(sched):
+	yield WaitCondition(lambda: sched.battery < 50)
+	print 'battery low'
+
+sched = RobotScheduler()
+sched.log_sink = None
+sched.profiler = Profiler(trace_capacity=100)
+tids = dict((name, sched.new_task(f(sched))) for name, f in [('planner', planner), ('camera', camera), ('monitor', monitor)])
+sched.run()
+stats = sched.profiler.snapshot()
+
+print '* Slices *'
+resumes = dict((name, stats['tasks'][tids[name]]['resumes']) for name in tids)
+print 'resumes:', sorted(resumes.items())
+assert resumes == { 'planner': 4, 'camera': 3, 'monitor': 2 }
+assert stats['slices'] == 9
+assert stats['syscalls'] == { 'WaitCondition': 1, 'WaitDuration': 5, 'exit': 3 }
+assert stats['timers'] == 5
+# the monitor waits once the battery is at 70, and is woken at 40
+assert stats['condition_evaluations'] == 1
+
+print '* Times *'
+planner_profile = stats['tasks'][tids['planner']]
+camera_profile = stats['tasks'][tids['camera']]
+assert planner_profile['cpu_time'] >= 0.06, planner_profile
+assert planner_profile['max_cpu_time'] >= 0.02 and planner_profile['max_wall_time'] >= 0.02, planner_profile
+assert camera_profile['wall_time'] >= 0.04, camera_profile
+assert camera_profile['cpu_time'] < 0.02, camera_profile
+assert stats['duration'] >= planner_profile['wall_time'] + camera_profile['wall_time']
+print 'times measured'
+
+print '* Trace *'
+trace = sched.profiler.chrome_trace()['traceEvents']
+slices = [event for event in trace if event['ph'] == 'X']
+assert len(slices) == 9
+planner_traced = sum(event['dur'] for event in slices if event['tid'] == tids['planner']) / 1e6
+assert abs(planner_traced - planner_profile['wall_time']) < 1e-6
+print 'slices traced:', len(slices)
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import os
+import random
+import tempfile
+import threading
+sys.path.append('..')
+from teer import *
+
+class Robot(TimerScheduler):
+	energy = ConditionVariable(100)
+	charging = ConditionVariable(False)
+	def __init__(self, observations):
+		super(Robot, self).__init__()
+		self.log_sink = None
+		self.observations = observations
+
+class ReplayedRobot(SimulatedTimeScheduler):
+	energy = ConditionVariable(100)
+	charging = ConditionVariable(False)
+	def __init__(self, start_time, observations):
+		super(ReplayedRobot, self).__init__(start_time)
+		self.log_sink = None
+		self.observations = observations
+
+def drive(sched):
+	for i in xrange(150):
+		yield WaitDuration(0.002)
+		if sched.charging:
+			sched.energy += 3
+		else:
+			sched.energy -= 2
+		sched.observations.append(('drive', sched.energy, sched.charging))
+
+def low_energy(sched):
+	while True:
+		yield WaitCondition(lambda: sched.energy < 50)
+		sched.observations.append(('low', sched.energy))
+		sched.new_task(beacon(sched))
+		yield WaitCondition(lambda: sched.energy >= 50)
+
+def beacon(sched):
+	for i in xrange(3):
+		yield WaitDuration(0.003)
+		sched.observations.append(('beacon', i, sched.energy))
+
+def operator_thread(sched):
+	# an operator toggling charging, at times only known to the recording
+	generator = random.Random(1)
+	while sched.taskmap:
+		time.sleep(generator.uniform(0.02, 0.06))
+		sched.set_threadsafe('charging', not sched.charging)
+
+def stop(sched, drive_tid, monitor_tid):
+	yield WaitTask(drive_tid)
+	sched.kill_task(monitor_tid)
+
+def events(filename):
+	""" Return the recorded events, without times, with tids numbered by creation """
+	log = EventLog(filename)
+	tids = { None: None }
+	result = []
+	for event in log:
+		kind = event[0]
+		if kind == 'created':
+			tids[event[2]] = len(tids)
+			result.append((kind, tids[event[2]], event[3]))
+		elif kind == 'exited':
+			result.append((kind, tids[event[2]]))
+		elif kind == 'set':
+			result.append((kind, event[2], tids[event[3]], event[4]))
+		elif kind == 'timer':
+			# the replay clock does not advance within steps, so timers are due slightly earlier
+			result.append((kind,))
+	log.close()
+	return result
+
+directory = tempfile.mkdtemp()
+field_filename = os.path.join(directory, 'field.log')
+replay_filename = os.path.join(directory, 'replay.log')
+
+print '* Field run *'
+field_observations = []
+sched = Robot(field_observations)
+sched.recorder = EventRecorder(field_filename)
+drive_tid = sched.new_task(drive(sched))
+monitor_tid = sched.new_task(low_energy(sched))
+sched.new_task(stop(sched, drive_tid, monitor_tid))
+thread = threading.Thread(target=operator_thread, args=(sched,))
+thread.start()
+sched.run()
+thread.join()
+sched.recorder.close()
+field_events = events(field_filename)
+assert len(field_observations) > 100, len(field_observations)
+print 'observations recorded'
+assert [event for event in field_events if event[0] == 'set' and event[2] is None]
+print 'outside writes recorded'
+
+print '* Replay *'
+log = EventLog(field_filename)
+replay_observations = []
+sched = ReplayedRobot(log.start_time, replay_observations)
+sched.recorder = EventRecorder(replay_filename)
+drive_tid = sched.new_task(drive(sched))
+monitor_tid = sched.new_task(low_energy(sched))
+sched.new_task(stop(sched, drive_tid, monitor_tid))
+log.replay(sched)
+log.close()
+sched.recorder.close()
+assert replay_observations == field_observations
+print 'same observations'
+assert events(replay_filename) == field_events
+print 'same events'
+assert not sched.taskmap, sched.taskmap
+print 'no tasks left'
+
+print '* Truncated log *'
+with open(field_filename, 'rb') as f:
+	data = f.read()
+with open(field_filename, 'wb') as f:
+	f.write(data[:-5])
+assert len(events(field_filename)) == len(field_events) - 1
+print 'events read up to the truncated one'
+
+print '* Large values *'
+class Mapper(SimulatedTimeScheduler):
+	path = ConditionVariable([])
+	scan = ConditionVariable()
+def planner(sched):
+	yield WaitCondition(lambda: len(sched.path) > 10000)
+	print 'path received'
+large_filename = os.path.join(directory, 'large.log')
+sched = Mapper()
+sched.log_sink = None
+sched.recorder = EventRecorder(large_filename)
+sched.new_task(planner(sched))
+sched.step()
+sched.path = range(20000)
+sched.scan = set(xrange(20000))
+sched.step()
+sched.recorder.close()
+log = EventLog(large_filename)
+values = [event[4] for event in log if event[0] == 'set']
+log.close()
+assert values == [range(20000), set(xrange(20000))]
+print 'values read back'
+
+print '* Writing error *'
+class FullDisk(object):
+	def write(self, data):
+		raise IOError('no space left on device')
+	def flush(self):
+		pass
+	def close(self):
+		pass
+recorder = EventRecorder(os.path.join(directory, 'full.log'))
+recorder.file.close()
+recorder.file = FullDisk()
+for i in xrange(3):
+	recorder.step(i)
+	recorder._write_buffer()
+for method in [recorder.flush, recorder.close]:
+	try:
+		method()
+	except IOError as e:
+		print '%s: IOError: %s' % (method.__name__, e)
+assert not recorder.thread.is_alive()
+print 'writing thread stopped'
+
+for filename in [field_filename, replay_filename, large_filename, os.path.join(directory, 'full.log')]:
+	os.remove(filename)
+os.rmdir(directory)
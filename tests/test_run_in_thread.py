@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+def blocking_read(duration):
+	time.sleep(duration)
+	return 'data'
+
+def failing_read():
+	raise IOError('device not ready')
+
+def reader():
+	print 'Reading'
+	data = yield RunInThread(blocking_read, 1)
+	print 'Read', data
+	try:
+		yield RunInThread(failing_read)
+	except IOError as e:
+		print 'Failed:', e
+
+def ticker(gaps):
+	last_time = sched.current_time()
+	for i in xrange(100):
+		yield WaitDuration(0.01)
+		now = sched.current_time()
+		gaps.append(now - last_time)
+		last_time = now
+
+def killed():
+	yield RunInThread(blocking_read, 1)
+	print 'Should not be there'
+
+sched = TimerScheduler()
+sched.thread_pool_workers = 1
+
+print '* Blocking calls do not stall other tasks *'
+gaps = []
+sched.new_task(reader())
+sched.new_task(ticker(gaps))
+sched.run()
+print 'ticks:', len(gaps)
+assert max(gaps) < 0.05, max(gaps)
+print 'max time between ticks below 50 ms'
+
+print '* Killing a task cancels its call *'
+first_tid = sched.new_task(killed())
+second_tid = sched.new_task(killed())
+sched.step()
+start_time = time.time()
+sched.kill_tasks([first_tid, second_tid])
+sched.shutdown_pools()
+duration = time.time() - start_time
+assert duration < 1.5, duration
+print 'waited for the running call only'
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+def say(msg):
+	print '[%7.2f] %s' % (sched.current_time(), msg)
+
+def tick():
+	rate = sched.create_rate(2)
+	while True:
+		say('tick')
+		yield Sleep(rate)
+
+def world():
+	say('World')
+	yield WaitDuration(0.2)
+	say('happy')
+	yield WaitDuration(2)
+	say('but...')
+
+def hello():
+	tick_tid = sched.new_task(tick())
+	say('Hello')
+	yield WaitDuration(1)
+	say('I am rather shy')
+	world_tid = sched.new_task(world())
+	yield WaitTask(world_tid)
+	say('World is dead now')
+	yield WaitDuration(1)
+	sched.kill_task(tick_tid)
+
+def mission():
+	rate = sched.create_rate(10)
+	for i in xrange(10 * 3600 * 10):
+		yield Sleep(rate)
+	say('Ten hours later')
+
+sched = SimulatedTimeScheduler()
+sched.new_task(hello())
+print '* Run until 2 s *'
+sched.run_until(2)
+say('Stopped')
+print '* Run to the end *'
+sched.run()
+say('Stopped')
+
+print '* Long mission *'
+start_time = time.time()
+sched.new_task(mission())
+sched.run()
+duration = time.time() - start_time
+assert duration < 10, duration
+print 'simulated in less than 10 s'
+
+print '* Waiting for a condition nobody sets *'
+class RobotScheduler(SimulatedTimeScheduler):
+	docked = ConditionVariable(False)
+def wait_docked():
+	yield WaitCondition(lambda: sched.docked)
+	say('Docked')
+def blocking_read():
+	time.sleep(0.05)
+	return 'data'
+def reader():
+	data = yield RunInThread(blocking_read)
+	say('Read %s' % data)
+sched = RobotScheduler()
+sched.new_task(wait_docked())
+sched.new_task(reader())
+sched.run()
+say('Stopped with %d task waiting' % len(sched.taskmap))
+sched.shutdown_pools()
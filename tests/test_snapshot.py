@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import gc
+sys.path.append('..')
+from teer import *
+
+class RobotScheduler(SimulatedTimeScheduler):
+	energy = ConditionVariable(100)
+
+class Patrol(RestartableTask):
+	def __init__(self, waypoints):
+		self.waypoints = waypoints
+	def run(self, sched):
+		# phase is the waypoint being reached, the code after a wait is at the start of the loop
+		while True:
+			if self.phase > 0:
+				sched.printd('waypoint %d reached at %.1f' % (self.phase, sched.current_time()))
+			if self.phase == self.waypoints:
+				return
+			self.phase += 1
+			yield WaitDuration(1)
+
+class LowEnergy(RestartableTask):
+	def run(self, sched):
+		if self.phase == 0:
+			yield WaitCondition(self.condition(sched))
+			self.phase = 1
+		sched.printd('low energy: %d' % sched.energy)
+	def condition(self, sched):
+		return lambda: sched.energy < 10
+
+class Supervisor(RestartableTask):
+	def __init__(self, tids):
+		self.tids = tids
+	def run(self, sched):
+		if self.phase == 0:
+			self.phase = 1
+			yield WaitAllTasks(self.tids)
+		sched.printd('patrols done at %.1f' % sched.current_time())
+
+def drain(sched, slow_tid):
+	yield WaitDuration(1)
+	sched.resume_task(slow_tid)
+	sched.energy = 5
+
+sched = RobotScheduler()
+fast_tid = sched.new_task(Patrol(4))
+slow_tid = sched.new_task(Patrol(2))
+sched.new_task(LowEnergy())
+sched.new_task(Supervisor([fast_tid, slow_tid]))
+sched.pause_task(slow_tid)
+sched.run_until(1.5)
+sched.energy = 50
+data = sched.snapshot()
+print 'Snapshot of %d bytes' % len(data)
+
+print '* Restored in a standby scheduler *'
+standby = RobotScheduler(start_time=1.5)
+tids = standby.restore(data)
+print 'restored tasks:', tids
+# collections are suspended during the restore only
+assert gc.isenabled()
+print 'energy:', standby.energy
+print 'slow patrol paused:', standby.taskmap[slow_tid].state == Task.PAUSED_READY
+standby.new_task(drain(standby, slow_tid))
+standby.run()
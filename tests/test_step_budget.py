@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+
+def spinner(name, work):
+	i = 0
+	while True:
+		print name, i
+		i += 1
+		time.sleep(work)
+		yield Pass()
+
+def slow(work):
+	while True:
+		time.sleep(work)
+		yield Pass()
+
+sched = TimerScheduler()
+
+print '* Round robin with a budget of slices *'
+tids = [sched.new_task(spinner(name, 0)) for name in ['a', 'b', 'c']]
+for i in range(3):
+	print 'step ran %d slices' % sched.step(max_slices=2)
+sched.kill_tasks(tids)
+
+print '* Budget of time *'
+tids = [sched.new_task(slow(0.01)) for i in range(10)]
+slices = sched.step(max_time=0.035)
+assert 3 <= slices <= 5, slices
+print 'step ran between 3 and 5 slices'
+assert sched.step(max_time=0) == 1
+print 'at least one slice is run'
+sched.kill_tasks(tids)
+
+print '* Overruns *'
+sched.overrun_duration = 0.02
+fast_tid = sched.new_task(slow(0))
+slow_tid = sched.new_task(slow(0.03))
+sched.step(max_slices=6)
+print 'fast task overruns:', sched.taskmap[fast_tid].overruns
+print 'slow task overruns:', sched.taskmap[slow_tid].overruns
+sched.kill_tasks([fast_tid, slow_tid])
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+# Check the timing wheel against the heap with random timers: the same
+# timers fire in the same order when time advances by ticks, cancelled
+# timers never fire, len() agrees, and a run driven by next_time() fires
+# every timer at most one tick late without looping.
+
+import sys
+sys.path.append('..')
+from teer import *
+import random
+
+RESOLUTION = 0.01
+EPSILON = 1e-6
+
+def small_wheel():
+	# 64 ticks over 2 levels, so that timers go through cascades and overflow
+	return WheelTimerQueue(resolution=RESOLUTION, slot_bits=3, levels=2)
+
+def random_time(generator, now):
+	kind = generator.random()
+	if kind < 0.1:
+		# already due
+		return now - generator.random() * 0.1
+	elif kind < 0.8:
+		return now + generator.random() * 0.5
+	else:
+		# beyond the last level
+		return now + generator.random() * 5.
+
+def compare_ticks(seed):
+	""" Advance both queues by ticks with random additions and cancellations, return the number of timers fired """
+	generator = random.Random(seed)
+	heap, wheel = HeapTimerQueue(), small_wheel()
+	now = 0.
+	heap.pop_due(now)
+	wheel.pop_due(now)
+	handles = []
+	fired = 0
+	for tick in xrange(1, 1500):
+		for i in xrange(generator.randint(0, 5)):
+			t = random_time(generator, now)
+			# keep away from tick boundaries, where the wheel rounds
+			t = (math.floor(t / RESOLUTION) + generator.uniform(0.01, 0.99)) * RESOLUTION
+			handles.append((heap.add(t, None, (len(handles),)), wheel.add(t, None, (len(handles),))))
+		for i in xrange(generator.randint(0, 2)):
+			if handles:
+				heap_timer, wheel_timer = handles.pop(generator.randrange(len(handles)))
+				assert heap.cancel(heap_timer) == wheel.cancel(wheel_timer)
+		assert len(heap) == len(wheel), (len(heap), len(wheel))
+		heap_next, wheel_next = heap.next_time(), wheel.next_time()
+		assert (heap_next is None) == (wheel_next is None)
+		if heap_next is not None:
+			# never later than the tick the next timer fires at
+			assert wheel_next <= math.ceil(heap_next / RESOLUTION - EPSILON) * RESOLUTION + EPSILON, (heap_next, wheel_next)
+		now = tick * RESOLUTION
+		heap_due = [timer.args for timer in heap.pop_due(now)]
+		wheel_due = [timer.args for timer in wheel.pop_due(now)]
+		assert heap_due == wheel_due, (now, heap_due, wheel_due)
+		fired += len(heap_due)
+	assert len(heap) == len(wheel)
+	return fired
+
+def run_by_next_time(seed):
+	""" Fire random timers in a loop driven by next_time(), as a scheduler does, return the number of timers fired """
+	generator = random.Random(seed)
+	wheel = small_wheel()
+	wheel.pop_due(0.)
+	times = {}
+	cancelled = set()
+	for i in xrange(500):
+		times[i] = random_time(generator, 0.)
+		timer = wheel.add(times[i], None, (i,))
+		if generator.random() < 0.2:
+			wheel.cancel(timer)
+			cancelled.add(i)
+	fired = set()
+	now = 0.
+	iterations = 0
+	while wheel:
+		iterations += 1
+		assert iterations < 10000, 'next_time() does not let pop_due() progress'
+		t = wheel.next_time()
+		if t > now:
+			now = t
+		for timer in wheel.pop_due(now):
+			i = timer.args[0]
+			assert i not in fired and i not in cancelled
+			# never early, and at most one tick late, timers already due when added firing at once
+			assert times[i] <= now + EPSILON, (now, times[i])
+			assert now - max(times[i], 0.) <= RESOLUTION + EPSILON, (now, times[i])
+			fired.add(i)
+	assert len(fired) + len(cancelled) == len(times)
+	return len(fired)
+
+print '* Same timers as the heap, tick by tick *'
+print 'timers fired:', sum(compare_ticks(seed) for seed in xrange(5)) > 0
+print '* Run driven by next_time() *'
+print 'timers fired:', sum(run_by_next_time(seed) for seed in xrange(5)) > 0
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# kate: replace-tabs off; indent-width 4; indent-mode normal
+# vim: ts=4:sw=4:noexpandtab
+
+# Copyright (c) 2012 Stéphane Magnenat, ETHZ Zürich and other contributors
+# See file authors.txt for details.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#   * Neither the name of Stéphane Magnenat, ETHZ Zürich, nor the names
+#     of the contributors may be used to endorse or promote products derived
+#     from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+sys.path.append('..')
+from teer import *
+import os
+import time
+import threading
+import resource
+
+class RobotScheduler(TimerScheduler):
+	battery = ConditionVariable(100.)
+
+def sleeper(sched):
+	yield WaitDuration(0.001)
+
+def sleeper_long(sched):
+	yield WaitDuration(3600)
+
+def wait_low_battery(sched):
+	yield WaitCondition(lambda: sched.battery < 10)
+	print 'battery low:', sched.battery
+
+def set_battery_later(sched):
+	time.sleep(0.05)
+	sched.set_threadsafe('battery', 5.)
+
+print '* Closing schedulers releases their pipes *'
+first_free_fd = os.dup(0)
+os.close(first_free_fd)
+for i in xrange(1000):
+	with RobotScheduler() as sched:
+		sched.log_sink = None
+		sched.new_task(sleeper(sched))
+		# opens the pipe, whether or not the timer is already due when run() sleeps
+		sched.set_threadsafe('battery', 50.)
+		sched.run()
+		assert sched.wakeup_pipe.fds is not None
+	assert sched.wakeup_pipe.fds is None
+fd = os.dup(0)
+os.close(fd)
+assert fd == first_free_fd, 'descriptors leaked'
+print 'descriptors released'
+
+print '* Woken up by another thread with high file descriptors *'
+# push the descriptors of the wakeup pipe above what select() handles
+soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+if soft < 1200:
+	resource.setrlimit(resource.RLIMIT_NOFILE, (min(1200, hard), hard))
+fillers = [os.dup(0) for i in xrange(1100)]
+with RobotScheduler() as sched:
+	sched.log_sink = None
+	sched.new_task(wait_low_battery(sched))
+	thread = threading.Thread(target=set_battery_later, args=(sched,))
+	thread.start()
+	sched.run()
+	thread.join()
+	assert min(sched.wakeup_pipe.fds) > 1024
+assert sched.wakeup_pipe.fds is None
+for fd in fillers:
+	os.close(fd)
+
+print '* First wakeup during a long sleep *'
+set_times = []
+def set_battery_timed(sched):
+	time.sleep(0.05)
+	set_times.append(time.time())
+	sched.set_threadsafe('battery', 5.)
+def kill_later(sched, tid):
+	yield WaitCondition(lambda: sched.battery < 10)
+	latency = time.time() - set_times[0]
+	assert latency < 0.01, latency
+	sched.kill_task(tid)
+with RobotScheduler() as sched:
+	sched.log_sink = None
+	sched.new_task(kill_later(sched, sched.new_task(sleeper_long(sched))))
+	thread = threading.Thread(target=set_battery_timed, args=(sched,))
+	thread.start()
+	sched.run()
+	thread.join()
+print 'woken up at once'
+
+print '* Fleet woken up by another thread *'
+class RobotFleetScheduler(FleetScheduler):
+	battery = ConditionVariable(100.)
+with Fleet() as fleet:
+	sched = RobotFleetScheduler(fleet)
+	sched.log_sink = None
+	sched.new_task(wait_low_battery(sched))
+	thread = threading.Thread(target=set_battery_later, args=(sched,))
+	thread.start()
+	fleet.run()
+	thread.join()
+	assert fleet.wakeup_pipe.fds is not None
+assert fleet.wakeup_pipe.fds is None